@@ -0,0 +1,281 @@
+"""Сравнение ASGI и WSGI при множестве одновременных соединений.
+
+    python -m benchmarks.asgi --posts 10000 --connections 100 --slow 50
+
+Оба сервера запускаются в этом же процессе на одной тестовой БД:
+  * ASGI - core.asgi.ASGIHandler под uvicorn, если он установлен, иначе
+    под простым встроенным HTTP/1.1-сервером на asyncio;
+  * WSGI - wsgiref с ограниченным пулом потоков того же размера, что и
+    пул БД ASGI (ASYNC_DB_POOL_SIZE), как у типичного потокового сервера.
+Клиент на asyncio держит --connections быстрых соединений и --slow
+медленных, которые передают запрос по частям в течение --slow-delay
+секунд. Медленный клиент занимает поток WSGI-сервера, а ASGI-сервер
+ждёт его в цикле событий; выводятся пропускная способность и задержки
+быстрых клиентов.
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from benchmarks.common import percentile, seed, setup_django
+
+HOST = '127.0.0.1'
+REASONS = {200: 'OK', 304: 'Not Modified', 404: 'Not Found'}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref с обработкой соединений в ограниченном пуле потоков"""
+
+    def __init__(self, address, pool_size):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=pool_size)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_in_pool, request, client_address)
+
+    def process_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+async def handle_asgi(app, reader, writer):
+    """Одно соединение встроенного сервера: один запрос, Connection: close"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+        return
+    lines = head.decode('latin-1').split('\r\n')
+    method, target, _ = lines[0].split(' ', 2)
+    headers = [
+        line.split(':', 1) for line in lines[1:] if ':' in line
+    ]
+    headers = [
+        (name.strip().lower().encode(), value.strip().encode())
+        for name, value in headers
+    ]
+    length = int(dict(headers).get(b'content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method,
+        'path': path, 'query_string': query.encode(), 'headers': headers,
+        'server': (HOST, 0), 'client': writer.get_extra_info('peername'),
+    }
+    messages = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            writer.write(
+                f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'.encode()
+            )
+            for name, value in message['headers']:
+                writer.write(name + b': ' + value + b'\r\n')
+            writer.write(b'Connection: close\r\n\r\n')
+        else:
+            writer.write(message.get('body', b''))
+        await writer.drain()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        writer.close()
+
+
+def start_asgi(app, port):
+    """ASGI-сервер в фоновом потоке; возвращает функцию остановки"""
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if uvicorn is not None:
+        server = uvicorn.Server(uvicorn.Config(
+            app, host=HOST, port=port, lifespan='off', log_level='warning'
+        ))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        def stop():
+            server.should_exit = True
+            thread.join()
+        return 'uvicorn', stop
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(
+        lambda reader, writer: handle_asgi(app, reader, writer),
+        HOST, port, backlog=1024,
+    ))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    return 'asyncio', stop
+
+
+def start_wsgi(app, port, pool_size):
+    server = PooledWSGIServer((HOST, port), pool_size)
+    server.request_queue_size = 1024
+    server.set_app(app)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+        server.pool.shutdown()
+    return f'wsgiref x{pool_size}', stop
+
+
+async def fetch(port, path, slow_delay=0):
+    """GET-запрос; медленный клиент отправляет его по частям"""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: testserver\r\n'
+        f'Connection: close\r\n\r\n'
+    ).encode()
+    try:
+        if slow_delay:
+            parts = 5
+            step = len(request) // parts + 1
+            for start in range(0, len(request), step):
+                writer.write(request[start:start + step])
+                await writer.drain()
+                await asyncio.sleep(slow_delay / parts)
+        else:
+            writer.write(request)
+            await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, paths, connections, slow, slow_delay, duration):
+    """Нагрузка: (задержки быстрых клиентов, ошибки)"""
+    rng = random.Random(0)
+    deadline = time.perf_counter() + duration
+    timings = []
+    errors = 0
+
+    async def client(delay):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, rng.choice(paths), delay)
+            except (OSError, ValueError, IndexError):
+                status = None
+            if status != 200:
+                errors += 1
+            elif not delay:
+                timings.append(time.perf_counter() - start)
+
+    await asyncio.gather(
+        *(client(0) for _ in range(connections)),
+        *(client(slow_delay) for _ in range(slow)),
+    )
+    return timings, errors
+
+
+def sample_paths(count):
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    paths = [reverse('posts:homepage')]
+    paths += [
+        reverse('posts:group_posts', kwargs={'slug': slug})
+        for slug in Group.objects.values_list('slug', flat=True)[:count]
+    ]
+    paths += [
+        reverse('posts:profile', kwargs={'username': username})
+        for username in User.objects.values_list(
+            'username', flat=True
+        )[:count]
+    ]
+    paths += [
+        reverse('posts:post_detail', kwargs={'post_id': post_id})
+        for post_id in Post.objects.values_list('id', flat=True)[:count]
+    ]
+    return paths
+
+
+def run(name, stop, port, args, paths):
+    started = time.perf_counter()
+    timings, errors = asyncio.run(load(
+        port, paths, args.connections, args.slow, args.slow_delay,
+        args.duration,
+    ))
+    elapsed = time.perf_counter() - started
+    stop()
+    if timings:
+        p50 = percentile(timings, 50) * 1000
+        p95 = percentile(timings, 95) * 1000
+    else:
+        p50 = p95 = float('nan')
+    print(
+        f'{name:<16} {len(timings) / elapsed:>9.1f} '
+        f'{p50:>9.1f} {p95:>9.1f} {errors:>7}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--slow', type=int, default=50,
+                        help='число медленных клиентов')
+    parser.add_argument('--slow-delay', type=float, default=2.0,
+                        help='сколько секунд медленный клиент шлёт запрос')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from core.asgi import ASGIHandler
+
+    seed(args.posts)
+    paths = sample_paths(20)
+    print(
+        f'{args.posts} постов, {args.connections} соединений, '
+        f'{args.slow} медленных, {args.duration:.0f} с'
+    )
+    print(f'{"сервер":<16} {"rps":>9} {"p50, мс":>9} {"p95, мс":>9} '
+          f'{"ошибки":>7}')
+    name, stop = start_asgi(ASGIHandler(), args.port)
+    run(f'ASGI {name}', stop, args.port, args, paths)
+    name, stop = start_wsgi(
+        WSGIHandler(), args.port + 1, settings.ASYNC_DB_POOL_SIZE
+    )
+    run(f'WSGI {name}', stop, args.port + 1, args, paths)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Общие утилиты бенчмарков: настройка Django и быстрое заполнение БД.
+
+Бенчмарки запускаются из корня репозитория, например:
+    python -m benchmarks.pagination --posts 1000000
+Все данные пишутся в отдельную тестовую БД, рабочая db.sqlite3 не
+затрагивается.
+"""
+import math
+import os
+import sys
+import time
+from datetime import timedelta
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'yatube'
+)
+
+
+def setup_django():
+    """Подключение проекта yatube и создание тестовой БД"""
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def seed(posts, authors=1000, groups=100, batch_size=10000):
+    """Заполнение БД постами с уникальными датами публикации"""
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.utils import timezone
+    from posts.management.commands.rebuild_post_counters import (
+        rebuild_post_counters
+    )
+    from posts import home_feed
+    from posts.bulk import preserve_dates
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'author{i}', first_name='Автор', last_name=str(i))
+        for i in range(authors)
+    )
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'group-{i}', description='-')
+        for i in range(groups)
+    )
+    author_ids = list(User.objects.values_list('id', flat=True))
+    group_ids = list(Group.objects.values_list('id', flat=True)) + [None]
+    start = timezone.now() - timedelta(seconds=posts)
+    with preserve_dates():
+        for offset in range(0, posts, batch_size):
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        text=f'Тестовый пост {i}',
+                        pub_date=start + timedelta(seconds=i),
+                        updated=start + timedelta(seconds=i),
+                        author_id=author_ids[i % len(author_ids)],
+                        group_id=group_ids[i % len(group_ids)],
+                    )
+                    for i in range(
+                        offset, min(offset + batch_size, posts)
+                    )
+                )
+    rebuild_post_counters()
+    if home_feed.is_enabled():
+        home_feed.rebuild()
+
+
+def timeit(func, repeat):
+    """Среднее время вызова func в миллисекундах"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def percentile(values, value):
+    """Перцентиль value (1-100) по ближайшему рангу.
+
+    statistics.quantiles появился только в Python 3.8, а CI гоняет и 3.7.
+    """
+    ordered = sorted(values)
+    rank = math.ceil(value / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
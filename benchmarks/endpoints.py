@@ -0,0 +1,221 @@
+"""Нагрузочный прогон страниц posts/ и users/ на разных объёмах данных.
+
+    python -m benchmarks.endpoints --sizes 10000,100000,1000000
+    python -m benchmarks.endpoints --sizes 10000 --compare old.json
+
+Для каждого объёма БД заполняется заново, затем каждая страница
+запрашивается --requests раз через тестовый клиент Django. Выводятся
+p50/p95/p99 времени ответа, среднее число SQL-запросов и пропускная
+способность; результаты сохраняются в JSON (--output) вместе с коммитом,
+чтобы сравнивать прогоны между коммитами через --compare.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.common import percentile, seed, setup_django
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+# Сколько разных групп, авторов и постов перебирают запросы
+SAMPLE_SIZE = 100
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def build_endpoints(rng):
+    """Список (имя, метод, клиент, функция -> (url, данные))"""
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    author = User.objects.get(username='author0')
+    guest = Client()
+    client = Client()
+    client.force_login(author)
+
+    slugs = list(Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE])
+    usernames = list(
+        User.objects.values_list('username', flat=True)[:SAMPLE_SIZE]
+    )
+    post_ids = list(Post.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+    own_post_ids = list(
+        author.posts.values_list('id', flat=True)[:SAMPLE_SIZE]
+    )
+    num_pages = max(Post.objects.count() // 10, 1)
+
+    def page():
+        # Смесь первых и глубоких страниц ленты
+        return rng.choice((1, 2, 10, rng.randint(1, num_pages)))
+
+    def get(name, **kwargs):
+        return lambda: (reverse(name, kwargs=kwargs or None), None)
+
+    return [
+        ('index', 'get', guest, lambda: (
+            reverse('posts:homepage') + f'?page={page()}', None
+        )),
+        ('group_posts', 'get', guest, lambda: (reverse(
+            'posts:group_posts', kwargs={'slug': rng.choice(slugs)}
+        ), None)),
+        ('profile', 'get', guest, lambda: (reverse(
+            'posts:profile', kwargs={'username': rng.choice(usernames)}
+        ), None)),
+        ('post_detail', 'get', guest, lambda: (reverse(
+            'posts:post_detail', kwargs={'post_id': rng.choice(post_ids)}
+        ), None)),
+        ('search', 'get', guest, lambda: (
+            reverse('posts:search') + f'?q=пост+{rng.randint(0, 999)}', None
+        )),
+        ('post_create_form', 'get', client, get('posts:post_create')),
+        ('post_create', 'post', client, lambda: (
+            reverse('posts:post_create'),
+            {'text': 'Пост из бенчмарка', 'group': ''}
+        )),
+        ('post_edit_form', 'get', client, lambda: (reverse(
+            'posts:post_edit', kwargs={'post_id': rng.choice(own_post_ids)}
+        ), None)),
+        ('post_edit', 'post', client, lambda: (reverse(
+            'posts:post_edit', kwargs={'post_id': rng.choice(own_post_ids)}
+        ), {'text': f'Правка из бенчмарка {rng.random()}'})),
+        ('signup', 'get', guest, get('users:signup')),
+        ('login', 'get', guest, get('users:login')),
+        ('password_reset', 'get', guest, get('users:password_reset_form')),
+        ('password_change', 'get', client, get('users:password_change_form')),
+    ]
+
+
+def measure(method, client, request, requests, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        url, data = request()
+        getattr(client, method)(url, data)
+    timings = []
+    queries = []
+    statuses = set()
+    started = time.perf_counter()
+    for _ in range(requests):
+        url, data = request()
+        with CaptureQueriesContext(connection) as captured:
+            request_started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            timings.append((time.perf_counter() - request_started) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - started
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries': round(statistics.mean(queries), 2),
+        'rps': round(requests / elapsed, 1),
+        'statuses': sorted(statuses),
+    }
+
+
+def compare(results, path):
+    """Изменение p95 относительно сохранённого прогона"""
+    with open(path) as stream:
+        previous = json.load(stream)
+    print(f'\nСравнение с {previous["commit"]} ({path}), p95:')
+    for size, endpoints in results['sizes'].items():
+        for name, stats in endpoints.items():
+            old = previous['sizes'].get(size, {}).get(name)
+            if old is None:
+                continue
+            change = (stats['p95_ms'] / old['p95_ms'] - 1) * 100
+            print(
+                f'{size:>9} {name:<18} {old["p95_ms"]:>9.2f} -> '
+                f'{stats["p95_ms"]:>9.2f} мс ({change:+.1f}%), '
+                f'запросов {old["queries"]} -> {stats["queries"]}'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--authors', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Файл результатов (JSON)')
+    parser.add_argument('--compare', help='Прошлый файл результатов')
+    args = parser.parse_args()
+    if args.requests < 1:
+        parser.error('--requests: нужен хотя бы один запрос')
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    setup_django()
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+
+    commit = current_commit()
+    results = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'requests': args.requests,
+        'sizes': {},
+    }
+    header = (
+        f'{"страница":<18} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} '
+        f'{"запросов":>9} {"запр./с":>9}'
+    )
+    for size in sizes:
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        print(f'\nЗаполнение БД: {size} постов...')
+        seed(size, authors=args.authors, groups=args.groups)
+        call_command('rebuild_search_index', verbosity=0)
+        rng = random.Random(args.seed)
+        results['sizes'][size] = {}
+        print(header)
+        for name, method, client, request in build_endpoints(rng):
+            cache.clear()
+            stats = measure(
+                method, client, request, args.requests, args.warmup
+            )
+            results['sizes'][size][name] = stats
+            print(
+                f'{name:<18} {stats["p50_ms"]:>9.2f} {stats["p95_ms"]:>9.2f} '
+                f'{stats["p99_ms"]:>9.2f} {stats["queries"]:>9} '
+                f'{stats["rps"]:>9}'
+            )
+
+    # Ключи JSON - строки: приводим заранее, чтобы сравнение совпадало
+    results['sizes'] = {
+        str(size): endpoints for size, endpoints in results['sizes'].items()
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'endpoints-{commit}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as stream:
+        json.dump(results, stream, ensure_ascii=False, indent=2)
+    print(f'\nРезультаты сохранены в {output}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
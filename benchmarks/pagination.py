@@ -0,0 +1,55 @@
+"""Сравнение offset- и курсорной пагинации на глубоких страницах ленты.
+
+    python -m benchmarks.pagination --posts 1000000
+"""
+import argparse
+
+from benchmarks.common import seed, setup_django, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.paginator import Paginator
+    from posts.models import Post
+    from posts.paginators import FORWARD, CursorPaginator
+    from posts.views import POSTS_AMOUNT
+
+    print(f'Заполнение БД: {args.posts} постов...')
+    seed(args.posts)
+
+    queryset = Post.objects.all()
+    num_pages = Paginator(queryset, POSTS_AMOUNT).num_pages
+    print(f'{"страница":>10} {"offset, мс":>12} {"cursor, мс":>12}')
+    for number in sorted({1, 10, 100, num_pages // 2, num_pages}):
+        if number < 1:
+            continue
+
+        def offset_page():
+            # Новый Paginator на каждый запрос, как в get_page_obj
+            list(Paginator(queryset, POSTS_AMOUNT).page(number))
+
+        # Курсор указывает на последний пост предыдущей страницы
+        paginator = CursorPaginator(queryset, POSTS_AMOUNT)
+        anchor = paginator.queryset[(number - 1) * POSTS_AMOUNT - 1] \
+            if number > 1 else None
+
+        def cursor_page():
+            if anchor is None:
+                list(paginator.first_page())
+            else:
+                list(paginator.page(anchor.pub_date, anchor.pk, FORWARD))
+
+        print(
+            f'{number:>10} {timeit(offset_page, args.repeat):>12.2f} '
+            f'{timeit(cursor_page, args.repeat):>12.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
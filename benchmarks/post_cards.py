@@ -0,0 +1,46 @@
+"""Время рендера страницы из 10 карточек: холодный и тёплый кэш карточек.
+
+    python -m benchmarks.post_cards --repeat 200
+"""
+import argparse
+
+from benchmarks.common import seed, setup_django, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.cache import cache
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from posts.models import Post
+    from posts.views import POSTS_AMOUNT, get_page_obj
+
+    seed(POSTS_AMOUNT, authors=POSTS_AMOUNT, groups=POSTS_AMOUNT)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    # Страница загружается один раз: меряем только рендер шаблона
+    page_obj = get_page_obj(Post.objects.for_feed(), request)
+    list(page_obj)
+
+    def render():
+        render_to_string(
+            'posts/index.html', {'page_obj': page_obj}, request=request
+        )
+
+    def cold():
+        cache.clear()
+        render()
+
+    render()
+    print(f'Холодный кэш карточек: {timeit(cold, args.repeat):.3f} мс')
+    print(f'Тёплый кэш карточек:   {timeit(render, args.repeat):.3f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Первый запрос нового воркера с прогревом шаблонов и без него.
+
+    python -m benchmarks.templates --workers 5
+
+Каждый воркер - отдельный процесс с кэширующим загрузчиком шаблонов
+(DJANGO_TEMPLATE_CACHE=1), как после форка сервера приложений. Воркер
+заполняет тестовую БД, при --warm компилирует шаблоны (core.warmup) и
+запрашивает каждую страницу дважды: первый запрос без прогрева платит
+за разбор base.html, шапки, подвала и включений, второй - нет. Кроме
+времени ответа выводится время, потраченное в ответе на разбор шаблонов:
+остальная разница первого и второго запросов - промахи кэша фрагментов
+карточек, от шаблонов не зависящие. Выводятся медианы по воркерам.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import seed, setup_django
+
+
+def worker(warm, posts):
+    """Замеры одного воркера: JSON в stdout"""
+    setup_django()
+    from django.template.base import Template
+    from django.test import Client
+    from django.urls import reverse
+    from core.warmup import warm_templates
+    from posts.models import Post
+
+    seed(posts, authors=10, groups=5)
+    post = Post.objects.first()
+    urls = {
+        'index': reverse('posts:homepage'),
+        'group_posts': reverse(
+            'posts:group_posts', kwargs={'slug': post.group.slug}
+        ) if post.group else reverse('posts:homepage'),
+        'post_detail': reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ),
+        'about': reverse('about:author'),
+    }
+    parsing = [0.0]
+    compile_nodelist = Template.compile_nodelist
+
+    def timed_compile(template):
+        start = time.perf_counter()
+        try:
+            return compile_nodelist(template)
+        finally:
+            parsing[0] += time.perf_counter() - start
+
+    Template.compile_nodelist = timed_compile
+    result = {'warm_ms': 0.0, 'first': {}, 'second': {}, 'parse': {}}
+    if warm:
+        result['warm_ms'] = warm_templates()[1] * 1000
+    client = Client()
+    # URLconf, middleware и модули view загружаются при первом запросе
+    # к любой странице - загружаем их запросом без шаблонов, чтобы
+    # замер отражал только шаблоны
+    client.get(reverse('posts:group_search'), {'q': 'g'})
+    for attempt in ('first', 'second'):
+        for name, url in urls.items():
+            parsing[0] = 0.0
+            start = time.perf_counter()
+            client.get(url)
+            result[attempt][name] = (time.perf_counter() - start) * 1000
+            if attempt == 'first':
+                result['parse'][name] = parsing[0] * 1000
+    print(json.dumps(result))
+
+
+def run_workers(count, warm, posts):
+    env = dict(os.environ, DJANGO_TEMPLATE_CACHE='1', DJANGO_DEBUG='0')
+    command = [sys.executable, '-m', 'benchmarks.templates',
+               '--worker', '--posts', str(posts)]
+    if warm:
+        command.append('--warm')
+    results = []
+    for _ in range(count):
+        output = subprocess.run(
+            command, env=env, capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def report(label, results):
+    pages = list(results[0]['first'])
+    warm = statistics.median(result['warm_ms'] for result in results)
+    print(f'\n{label} (прогрев шаблонов: {warm:.1f} мс)')
+    print(f'{"страница":<14} {"1-й, мс":>9} {"разбор, мс":>11} '
+          f'{"2-й, мс":>9}')
+    for page in pages:
+        first = statistics.median(r['first'][page] for r in results)
+        parse = statistics.median(r['parse'][page] for r in results)
+        second = statistics.median(r['second'][page] for r in results)
+        print(f'{page:<14} {first:>9.2f} {parse:>11.2f} {second:>9.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.warm, args.posts)
+        return
+    report('Без прогрева', run_workers(args.workers, False, args.posts))
+    report('С прогревом', run_workers(args.workers, True, args.posts))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Подключаем настройку соединений с БД и проверку шаблонов
+        from . import checks, signals  # noqa: F401
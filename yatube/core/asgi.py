@@ -0,0 +1,330 @@
+"""ASGI-обработчик для Django 2.2, в которой своей поддержки ASGI нет.
+
+Медленные клиенты обслуживает цикл событий: тело запроса читается и
+ответ отправляется без занятого потока. Django-код выполняется в
+ограниченном пуле потоков ASYNC_DB_POOL_SIZE, размер которого задаёт
+число одновременных соединений с БД (ORM в Django 2.2 только
+синхронный). Страницы из ASYNC_VIEWS обслуживают асинхронные view: они
+сами отдают в пул запросы к БД и рендер шаблонов (см. run_sync), а хуки
+тех же экземпляров middleware, что и в обычном стеке
+(process_request/view/exception/response), выполняются вокруг них тоже
+в пуле. Middleware только с __call__ вокруг асинхронной view выполнить
+нельзя, поэтому с такими middleware обработчик не запускается. Остальные
+страницы целиком обрабатываются обычным стеком Django в пуле.
+"""
+import asyncio
+import contextvars
+import functools
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import (
+    convert_exception_to_response, response_for_exception
+)
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponseBadRequest
+from django.urls import Resolver404, get_resolver
+from django.utils.module_loading import import_string
+
+_pool = None
+# Контекст переменных текущего запроса: шаги запроса в пуле видят
+# значения, выставленные предыдущими шагами (например, выбор реплики)
+_request_context = contextvars.ContextVar('request_context', default=None)
+# Потоки пула, соединения которых уже проверены в текущем запросе
+_checked_threads = contextvars.ContextVar('checked_threads', default=None)
+
+HOOKS = (
+    'process_request', 'process_view', 'process_exception',
+    'process_response',
+)
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_POOL_SIZE,
+            thread_name_prefix='django-db',
+        )
+    return _pool
+
+
+def _call(func, args, kwargs):
+    # Как в начале обычного запроса: закрываем устаревшие соединения
+    # потока пула (CONN_MAX_AGE) и соединения с ошибками - один раз за
+    # запрос в каждом потоке, а не перед каждым шагом
+    checked = _checked_threads.get()
+    if checked is not None and threading.get_ident() not in checked:
+        checked.add(threading.get_ident())
+        close_old_connections()
+    return func(*args, **kwargs)
+
+
+async def run_sync(func, *args, **kwargs):
+    """Вызов синхронного кода (ORM, шаблоны, кэш) в пуле потоков БД"""
+    context = _request_context.get() or contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_pool(), functools.partial(context.run, _call, func, args, kwargs)
+    )
+
+
+def build_environ(scope, body):
+    """WSGI environ по ASGI scope: запрос Django 2.2 - это WSGIRequest"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами, прочитанными как latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': None,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Повторённые заголовки склеиваются, как это делает WSGI-сервер
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class MiddlewareHandler(BaseHandler):
+    """Обработчик Django, который сохраняет созданные экземпляры
+    middleware (self.middleware, в порядке MIDDLEWARE)"""
+
+    def load_middleware(self):
+        """Как BaseHandler.load_middleware"""
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        self.middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for path in reversed(settings.MIDDLEWARE):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if middleware is None:
+                raise ImproperlyConfigured(
+                    f'Middleware factory {path} returned None.'
+                )
+            if hasattr(middleware, 'process_view'):
+                self._view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self._template_response_middleware.append(
+                    middleware.process_template_response
+                )
+            if hasattr(middleware, 'process_exception'):
+                self._exception_middleware.append(
+                    middleware.process_exception
+                )
+            handler = convert_exception_to_response(middleware)
+            self.middleware.insert(0, middleware)
+        self._middleware_chain = handler
+
+
+class ASGIHandler:
+    """ASGI-приложение (спецификация ASGI 3) поверх обработчика Django"""
+
+    def __init__(self):
+        self.handler = MiddlewareHandler()
+        self.handler.load_middleware()
+        self.async_views = {
+            name: import_string(path)
+            for name, path in settings.ASYNC_VIEWS.items()
+        }
+        self.hooks = self.load_hooks()
+
+    def load_hooks(self):
+        """Middleware обычного стека с хуками process_* для асинхронных
+        view. Middleware только с __call__ вокруг асинхронной view
+        не выполнить: с ними обработчик не запускается."""
+        hooks = []
+        for middleware in self.handler.middleware:
+            if any(hasattr(middleware, hook) for hook in HOOKS):
+                hooks.append(middleware)
+            elif self.async_views:
+                raise ImproperlyConfigured(
+                    f'{type(middleware).__qualname__} не поддерживает '
+                    'асинхронные view: нужны хуки process_* или пустой '
+                    'ASYNC_VIEWS'
+                )
+        return hooks
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса целиком; None, если клиент отключился"""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        checked_token = _checked_threads.set(set())
+        token = _request_context.set(contextvars.copy_context())
+        try:
+            await run_sync(
+                signals.request_started.send,
+                sender=self.__class__, scope=scope
+            )
+            try:
+                request = WSGIRequest(build_environ(scope, body))
+            except UnicodeDecodeError:
+                response = HttpResponseBadRequest()
+            else:
+                response = await self.get_response(request)
+            await self.send_response(response, send)
+        finally:
+            _request_context.reset(token)
+            _checked_threads.reset(checked_token)
+            body.close()
+
+    async def get_response(self, request):
+        try:
+            match = get_resolver().resolve(request.path_info)
+        except Resolver404:
+            match = None
+        view = match and self.async_views.get(match.view_name)
+        if view is None:
+            # Обычный синхронный стек Django целиком в пуле
+            return await run_sync(self.handler.get_response, request)
+        request.resolver_match = match
+        return await self.call_async_view(request, view, match)
+
+    async def call_async_view(self, request, view, match):
+        """Асинхронная view между хуками middleware; исключения хуков и
+        view обрабатываются, как в обычном стеке"""
+        try:
+            response = await run_sync(self.before_view, request, match)
+        except Exception as error:
+            response = await run_sync(response_for_exception, request, error)
+        if response is None:
+            try:
+                response = await view(request, *match.args, **match.kwargs)
+            except Exception as error:
+                response = await run_sync(
+                    self.view_exception, request, error
+                )
+        try:
+            return await run_sync(self.after_view, request, response)
+        except Exception as error:
+            return await run_sync(response_for_exception, request, error)
+
+    def view_exception(self, request, error):
+        """Ответ на исключение view: process_exception middleware, затем
+        обычная обработка Django (404, 403, 500)"""
+        for process_exception in self.handler._exception_middleware:
+            response = process_exception(request, error)
+            if response:
+                return response
+        return response_for_exception(request, error)
+
+    def before_view(self, request, match):
+        for middleware in self.hooks:
+            if hasattr(middleware, 'process_request'):
+                response = middleware.process_request(request)
+                if response is not None:
+                    return response
+        for middleware in self.hooks:
+            if hasattr(middleware, 'process_view'):
+                response = middleware.process_view(
+                    request, match.func, match.args, match.kwargs
+                )
+                if response is not None:
+                    return response
+        return None
+
+    def after_view(self, request, response):
+        for middleware in reversed(self.hooks):
+            if hasattr(middleware, 'process_response'):
+                response = middleware.process_response(request, response)
+        return response
+
+    async def send_response(self, response, send):
+        headers = [
+            (name.encode('latin-1'), str(value).encode('latin-1'))
+            for name, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append(
+                (b'Set-Cookie', cookie.output(header='').strip().encode())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        try:
+            if response.streaming:
+                # Генератор ответа может читать БД - берём части в пуле
+                chunks = iter(response.streaming_content)
+                while True:
+                    chunk = await run_sync(next, chunks, None)
+                    if chunk is None:
+                        break
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+                await send({'type': 'http.response.body', 'body': b''})
+            else:
+                await send({
+                    'type': 'http.response.body', 'body': response.content
+                })
+        finally:
+            # close() ответа рассылает сигнал request_finished
+            await run_sync(response.close)
+
+
+def get_asgi_application():
+    import django
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,18 @@
+from django.core.checks import Error, Tags, register
+
+from .warmup import compile_templates
+
+
+@register(Tags.templates)
+def check_template_syntax(app_configs, **kwargs):
+    """Синтаксис шаблонов проекта проверяется при запуске, а не на
+    первом запросе к странице"""
+    return [
+        Error(
+            f'Ошибка в шаблоне {name}: {error}',
+            hint='Исправьте синтаксис шаблона.',
+            obj=name,
+            id='core.E001',
+        )
+        for name, error in compile_templates()[1]
+    ]
@@ -0,0 +1,139 @@
+"""Уменьшение HTML-ответов: схлопывание пробелов и сжатие gzip/brotli.
+
+minify_html убирает отступы и пустые строки шаблонов. Браузер и так
+схлопывает пробелы в тексте, поэтому вид страницы не меняется; пробел
+между тегами сохраняется, чтобы не склеить строчные элементы. Сами
+теги (пробелы в значениях атрибутов значимы), комментарии и содержимое
+<pre>, <textarea>, <script> и <style> не трогаются.
+
+Сжатие потоковое (compressobj), чтобы один и тот же код сжимал и
+обычные, и потоковые ответы. Потоковый ответ сбрасывается клиенту
+порциями по STREAM_FLUSH_SIZE байт: сброс после каждой маленькой части
+заметно ухудшает сжатие.
+"""
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Уровни для сжатия на лету: дальше выигрыш в размере мал, а время
+# растёт в разы. Статика сжимается заранее с максимальным уровнем
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# Сколько байт потока сжимать перед сбросом сжатой порции клиенту
+STREAM_FLUSH_SIZE = 64 * 1024
+# Начинаются с текста, сжатие имеет смысл
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson',
+    'application/javascript', 'application/xml', 'image/svg+xml',
+)
+# Блоки целиком, комментарии и теги; значение атрибута в кавычках может
+# содержать «>»
+PRESERVED = re.compile(
+    r'<(pre|textarea|script|style)\b.*?</\1\s*>'
+    r'|<!--.*?-->'
+    r'|<(?:[^>"\']|"[^"]*"|\'[^\']*\')*>',
+    re.IGNORECASE | re.DOTALL
+)
+# Только пробельные символы ASCII: неразрывный пробел значим
+WHITESPACE = re.compile(r'[ \t\r\f]*\n[ \t\r\n\f]*|[ \t\r\f]{2,}')
+
+
+def collapse(match):
+    return '\n' if '\n' in match.group() else ' '
+
+
+def minify_html(html):
+    """HTML без лишних пробелов и пустых строк"""
+    parts = []
+    position = 0
+    for preserved in PRESERVED.finditer(html):
+        text = html[position:preserved.start()]
+        parts.append(WHITESPACE.sub(collapse, text))
+        parts.append(preserved.group())
+        position = preserved.end()
+    parts.append(WHITESPACE.sub(collapse, html[position:]))
+    return ''.join(parts)
+
+
+def is_compressible(content_type):
+    return content_type.split(';')[0].strip().lower().startswith(
+        COMPRESSIBLE_TYPES
+    )
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0"""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class GzipCompressor:
+    def __init__(self):
+        # wbits=31: формат gzip с заголовком и контрольной суммой
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self.compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY
+        )
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def choose_encoding(accept_encoding):
+    """(Content-Encoding, класс компрессора) или (None, None)"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br', BrotliCompressor
+    if 'gzip' in accepted:
+        return 'gzip', GzipCompressor
+    return None, None
+
+
+def compress(data, compressor_class):
+    compressor = compressor_class()
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, compressor_class, flush_size=STREAM_FLUSH_SIZE):
+    """Сжатие потока: сжатое отправляется клиенту после каждых
+    flush_size байт исходных данных"""
+    compressor = compressor_class()
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            data += compressor.flush()
+            pending = 0
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,49 @@
+"""Чтение из реплик БД для страниц, которые только читают данные.
+
+ReplicaRoutingMiddleware отмечает запросы к страницам из
+REPLICA_READ_VIEWS, и на время такого запроса ReplicaRouter отправляет
+чтения в одну из реплик REPLICA_DATABASES. Запись всегда идёт в default.
+После любого изменяющего запроса пользователь на REPLICA_STICKY_SECONDS
+«прилипает» к основной БД, чтобы сразу видеть свои изменения несмотря на
+отставание реплик.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_read_db = ContextVar('read_db', default=None)
+
+# Данные входа читаются только из основной БД: сессия, созданная
+# мгновенье назад, могла ещё не попасть в реплику
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def use_replica():
+    """Переключение чтений текущего запроса на случайную реплику;
+    возвращает токен для release"""
+    return _read_db.set(random.choice(settings.REPLICA_DATABASES))
+
+
+def release(token):
+    _read_db.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return _read_db.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной БД: объекты из них можно связывать
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную БД, миграции к ним не применяются
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,60 @@
+"""«Дырявый» кэш страниц: общая для всех часть страницы кэшируется
+один раз, а персональные фрагменты (шапка с пользователем, кнопка
+правки) вставляются в неё при каждом ответе.
+
+Фрагмент в шаблоне объявляется тегом {% hole 'шаблон' ключ=значение %}
+из core.templatetags.holes. Обычно тег сразу рендерит шаблон фрагмента.
+Внутри punched(request) вместо фрагмента выводится метка-комментарий;
+fill(content, request) заменяет метки фрагментами, отрендеренными для
+конкретного запроса. Аргументы фрагмента - простые значения (JSON):
+метка хранится в кэше вместе со страницей. Подделать метку текстом
+поста нельзя: автоэкранирование превращает «<» в «&lt;».
+"""
+import base64
+import json
+import re
+from contextlib import contextmanager
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+MARKER = re.compile(rb'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+
+@contextmanager
+def punched(request, enabled=True):
+    """Рендер страницы для общего кэша: фрагменты заменяются метками.
+
+    Страницы ошибок, которые Django рендерит после исключения view, уже
+    выходят из блока и получают фрагменты как обычно.
+    """
+    request._page_holes = enabled
+    try:
+        yield
+    finally:
+        request._page_holes = False
+
+
+def is_punched(request):
+    return getattr(request, '_page_holes', False)
+
+
+def render(template_name, kwargs, request):
+    return render_to_string(template_name, kwargs, request=request)
+
+
+def marker(template_name, kwargs):
+    raw = json.dumps([template_name, kwargs], separators=(',', ':'))
+    return mark_safe(
+        f'<!--hole:{base64.urlsafe_b64encode(raw.encode()).decode()}-->'
+    )
+
+
+def fill(content, request):
+    """Страница content (bytes) с фрагментами для запроса request"""
+    def replace(match):
+        template_name, kwargs = json.loads(
+            base64.urlsafe_b64decode(match.group(1))
+        )
+        return render(template_name, kwargs, request).encode()
+    return MARKER.sub(replace, content)
@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную БД SQLite в файлы реплик REPLICA_DATABASES '
+        '(для локальной проверки чтения из реплик)'
+    )
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError(
+                'Копирование поддерживается только для SQLite, '
+                'реплики других БД настраиваются средствами самой БД'
+            )
+        if not settings.REPLICA_DATABASES:
+            raise CommandError(
+                'Реплики не настроены: задайте DJANGO_DB_REPLICAS'
+            )
+        source.ensure_connection()
+        for alias in settings.REPLICA_DATABASES:
+            # Соединение Django с репликой могло держать старый файл
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # Backup API копирует согласованный снимок даже во время записи
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: скопировано')
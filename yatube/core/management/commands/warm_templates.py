@@ -0,0 +1,19 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Компилирует все шаблоны проекта и проверяет их синтаксис'
+    # Проверка шаблонов среди системных проверок сама бы их скомпилировала
+    requires_system_checks = False
+
+    def handle(self, *args, **options):
+        try:
+            count, seconds = warm_templates()
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Скомпилировано шаблонов: {count} за {seconds * 1000:.0f} мс'
+        ))
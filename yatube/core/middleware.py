@@ -0,0 +1,227 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import compression, db_router, profiling
+from .signals import response_compressed
+
+# Параметр запроса, по которому персонал получает JSON-отчёт
+REPORT_PARAM = '_profile'
+# Cookie со временем, до которого чтения идут из основной БД
+STICKY_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов: число и время SQL-запросов, повторы,
+    время рендера шаблонов и view в заголовке Server-Timing.
+
+    Включается настройкой PROFILING; выключенное middleware Django
+    исключает из цепочки при запуске, и накладных расходов нет. Персонал
+    при PROFILING_REPORT получает вместо страницы JSON-отчёт по
+    ?_profile=json. Ставить последним в MIDDLEWARE, ближе всего к view.
+    Работает через process_request/process_response, поэтому и вокруг
+    асинхронных view.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        profiling.install_query_hook()
+        profiling.install_template_hook()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    def process_request(self, request):
+        request._profile = profiling.start()
+
+    def process_response(self, request, response):
+        started = request.__dict__.pop('_profile', None)
+        if started is None:
+            # Ответ дало middleware раньше в цепочке
+            return response
+        profile, token = started
+        profiling.stop(profile, token)
+        if self.wants_report(request):
+            return JsonResponse(
+                profile.as_dict(), json_dumps_params={'ensure_ascii': False}
+            )
+        response['Server-Timing'] = profile.server_timing()
+        return response
+
+    def wants_report(self, request):
+        user = getattr(request, 'user', None)
+        return (
+            settings.PROFILING_REPORT
+            and request.GET.get(REPORT_PARAM) == 'json'
+            and user is not None
+            and user.is_staff
+        )
+
+
+class CompressionMiddleware:
+    """Минификация HTML и сжатие gzip/brotli (core.compression).
+
+    Включается настройками RESPONSE_MINIFY_HTML и RESPONSE_COMPRESSION.
+    Обычный ответ меньше RESPONSE_COMPRESSION_MIN_SIZE байт после
+    минификации не сжимается. Потоковый ответ сжимается по частям, но
+    не минифицируется: тег <pre> может оказаться разрезан между частями.
+    Сжатие меняет тело, поэтому ETag становится слабым. О каждом
+    уменьшенном ответе сообщает сигнал core.signals.response_compressed.
+    Работает через process_response, поэтому и вокруг асинхронных view.
+    """
+
+    def __init__(self, get_response):
+        if not (
+            settings.RESPONSE_MINIFY_HTML or settings.RESPONSE_COMPRESSION
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.process_response(request, self.get_response(request))
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if response.has_header('Content-Encoding') or (
+            not compression.is_compressible(content_type)
+        ):
+            return response
+        encoding, compressor = None, None
+        if settings.RESPONSE_COMPRESSION:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            encoding, compressor = compression.choose_encoding(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')
+            )
+        if response.streaming:
+            if encoding:
+                response.streaming_content = self.compress_stream(
+                    request, response.streaming_content, encoding, compressor
+                )
+                self.mark_encoded(response, encoding)
+            return response
+
+        original_size = len(response.content)
+        if settings.RESPONSE_MINIFY_HTML and content_type.startswith(
+            'text/html'
+        ):
+            self.minify(response)
+        minified_size = len(response.content)
+        if minified_size < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            encoding = None
+        if encoding:
+            content = compression.compress(response.content, compressor)
+            if len(content) < minified_size:
+                response.content = content
+                self.mark_encoded(response, encoding)
+            else:
+                encoding = None
+        response['Content-Length'] = str(len(response.content))
+        self.report(
+            request, encoding, original_size, minified_size,
+            len(response.content),
+        )
+        return response
+
+    def minify(self, response):
+        try:
+            html = response.content.decode(response.charset)
+        except UnicodeDecodeError:
+            return
+        response.content = compression.minify_html(html).encode(
+            response.charset
+        )
+
+    def mark_encoded(self, response, encoding):
+        response['Content-Encoding'] = encoding
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+    def compress_stream(self, request, chunks, encoding, compressor):
+        sizes = [0, 0]
+
+        def counted():
+            for chunk in chunks:
+                sizes[0] += len(chunk)
+                yield chunk
+
+        for data in compression.compress_stream(counted(), compressor):
+            sizes[1] += len(data)
+            yield data
+        self.report(request, encoding, sizes[0], sizes[0], sizes[1])
+
+    def report(self, request, encoding, original, minified, compressed):
+        resolver_match = request.resolver_match
+        response_compressed.send(
+            sender=self.__class__,
+            request=request,
+            view_name=resolver_match.view_name if resolver_match else None,
+            encoding=encoding,
+            original_size=original,
+            minified_size=minified,
+            compressed_size=compressed,
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Чтение из реплик для страниц REPLICA_READ_VIEWS (core.db_router).
+
+    Без REPLICA_DATABASES middleware исключается из цепочки. Изменяющий
+    запрос ставит cookie, и до её истечения все чтения пользователя идут
+    в основную БД. Вся работа - в хуках process_view/process_response,
+    поэтому middleware работает и вокруг асинхронных view (core.asgi).
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            # Реплика не должна остаться выбранной для следующего
+            # запроса этого потока
+            self.release(request)
+            raise
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        self.release(request)
+        if request.method not in SAFE_METHODS:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, str(int(time.time() + sticky)), max_age=sticky
+            )
+        return response
+
+    def release(self, request):
+        token = request.__dict__.pop('_replica_token', None)
+        if token is not None:
+            db_router.release(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+            and not self.is_sticky(request)
+        ):
+            request._replica_token = db_router.use_replica()
+
+    def is_sticky(self, request):
+        try:
+            until = int(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
@@ -0,0 +1,140 @@
+"""Сбор профиля запроса: SQL-запросы, рендер шаблонов и время view.
+
+Профиль текущего запроса хранится в contextvars, поэтому сбор
+корректен и при обработке запросов в нескольких потоках, и когда шаги
+одного запроса выполняются в разных потоках пула (core.asgi). Запросы
+к БД перехватываются обёрткой CursorWrapper._execute_with_wrappers, а
+рендер шаблонов - обёрткой Template._render: обе ставятся один раз при
+включении профилирования (см. core.middleware.ProfilingMiddleware).
+"""
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Template
+
+_current = ContextVar('request_profile', default=None)
+
+# Списки параметров разной длины в IN (...) дают один отпечаток
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+def fingerprint(sql):
+    """Текст запроса без значений параметров"""
+    return IN_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.queries = []
+        self.render_time = 0.0
+        self.templates = defaultdict(float)
+        self._render_depth = 0
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Отпечатки запросов, выполненных больше одного раза"""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.most_common() if count > 1}
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing (длительности в мс)"""
+        duplicated = sum(self.duplicates().values())
+        return ', '.join((
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{len(self.queries)} queries, {duplicated} duplicated"',
+            f'tpl;dur={self.render_time * 1000:.1f}',
+            f'view;dur={self.total * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        return {
+            'view_ms': round(self.total * 1000, 3),
+            'sql': {
+                'count': len(self.queries),
+                'time_ms': round(self.sql_time * 1000, 3),
+                'queries': [
+                    {'sql': sql, 'time_ms': round(duration * 1000, 3)}
+                    for sql, duration in self.queries
+                ],
+                'duplicates': self.duplicates(),
+            },
+            'templates': {
+                'time_ms': round(self.render_time * 1000, 3),
+                # Время шаблона включает вложенные в него include
+                'by_name': {
+                    name: round(duration * 1000, 3)
+                    for name, duration in sorted(
+                        self.templates.items(), key=lambda item: -item[1]
+                    )
+                },
+            },
+        }
+
+
+def start():
+    """Начало сбора профиля; возвращает (профиль, токен для stop)"""
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop(profile, token):
+    _current.reset(token)
+    profile.finish()
+
+
+def install_query_hook():
+    """Подмена CursorWrapper._execute_with_wrappers на замеряющую версию
+    (один раз): в отличие от connection.execute_wrapper, она действует
+    на соединения всех потоков"""
+    original = CursorWrapper._execute_with_wrappers
+    if getattr(original, 'profiled', False):
+        return
+
+    def _execute_with_wrappers(self, sql, params, many, executor):
+        profile = _current.get()
+        if profile is None:
+            return original(self, sql, params, many, executor)
+        started = time.perf_counter()
+        try:
+            return original(self, sql, params, many, executor)
+        finally:
+            profile.queries.append((sql, time.perf_counter() - started))
+
+    _execute_with_wrappers.profiled = True
+    CursorWrapper._execute_with_wrappers = _execute_with_wrappers
+
+
+def install_template_hook():
+    """Подмена Template._render на замеряющую версию (один раз)"""
+    original = Template._render
+    if getattr(original, 'profiled', False):
+        return
+
+    def _render(self, context):
+        profile = _current.get()
+        if profile is None:
+            return original(self, context)
+        profile._render_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            duration = time.perf_counter() - started
+            profile._render_depth -= 1
+            profile.templates[self.name or '<string>'] += duration
+            if not profile._render_depth:
+                profile.render_time += duration
+
+    _render.profiled = True
+    Template._render = _render
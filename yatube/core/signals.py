@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import Signal, receiver
+
+# Ответ уменьшен core.middleware.CompressionMiddleware. Размеры тела в
+# байтах: исходный, после минификации HTML и отправленный клиенту;
+# encoding - None, если ответ не сжат. Для потокового ответа сигнал
+# посылается после отправки последней части
+response_compressed = Signal(providing_args=[
+    'request', 'view_name', 'encoding',
+    'original_size', 'minified_size', 'compressed_size',
+])
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Настройка нового соединения с SQLite по SQLITE_PRAGMAS"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
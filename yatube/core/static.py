@@ -0,0 +1,134 @@
+"""Раздача собранной статики (STATIC_ROOT) прямо из WSGI-приложения.
+
+StaticFilesApp оборачивает WSGI-приложение Django: запросы к файлам
+статики обслуживаются до Django, без middleware и URLconf. Список
+файлов строится один раз при запуске - после collectstatic статика не
+меняется, - поэтому раздаются только известные файлы и пути вида
+../ не могут выйти за пределы STATIC_ROOT.
+
+Файлы с хешем содержимого в имени (core.storage) кэшируются браузером
+навсегда (immutable), остальные - на STATIC_MAX_AGE секунд. Клиенту,
+который принимает сжатие, отдаётся заранее сжатая копия .br или .gz.
+"""
+import json
+import mimetypes
+import os
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+
+from .compression import accepted_encodings
+
+# Год - предел, который соблюдают браузеры и прокси
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_NAME = 'staticfiles.json'
+# Расширение сжатой копии и значение Content-Encoding, в порядке
+# предпочтения
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class StaticFile:
+    """Файл статики и его сжатые копии: (encoding, путь, размер)"""
+
+    def __init__(self, path, immutable, max_age):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.last_modified = http_date(stat.st_mtime)
+        self.mtime = int(stat.st_mtime)
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in (
+            'application/javascript', 'application/json', 'image/svg+xml',
+        ):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.cache_control = (
+            IMMUTABLE_CACHE_CONTROL if immutable
+            else f'public, max-age={max_age}'
+        )
+        self.variants = [
+            (encoding, path + suffix, os.path.getsize(path + suffix))
+            for suffix, encoding in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+
+    def choose(self, accept_encoding):
+        """(encoding или None, путь, размер) под Accept-Encoding"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, path, size in self.variants:
+            if encoding in accepted:
+                return encoding, path, size
+        return None, self.path, self.size
+
+
+def hashed_names(root):
+    """Имена файлов с хешем из манифеста collectstatic"""
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest:
+            return set(json.load(manifest).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def scan(root, prefix, max_age):
+    """Файлы STATIC_ROOT по путям запроса (PATH_INFO)"""
+    hashed = hashed_names(root)
+    compressed = tuple(suffix for suffix, _ in ENCODINGS)
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            if name.endswith(compressed) or relative == MANIFEST_NAME:
+                continue
+            # PATH_INFO в WSGI - байты UTF-8, прочитанные как latin-1
+            url = (prefix + relative).encode().decode('latin-1')
+            files[url] = StaticFile(path, relative in hashed, max_age)
+    return files
+
+
+class StaticFilesApp:
+    """WSGI-приложение: статика из root по адресам prefix, остальные
+    запросы передаются application"""
+
+    def __init__(self, application, root=None, prefix=None, max_age=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        prefix = prefix or settings.STATIC_URL
+        if max_age is None:
+            max_age = settings.STATIC_MAX_AGE
+        self.files = scan(root, prefix, max_age) if root else {}
+
+    def __call__(self, environ, start_response):
+        static = self.files.get(environ.get('PATH_INFO', ''))
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if static is None or method not in SAFE_METHODS:
+            return self.application(environ, start_response)
+        encoding, path, size = static.choose(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        headers = [
+            ('Cache-Control', static.cache_control),
+            ('Last-Modified', static.last_modified),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        if since is not None and since >= static.mtime:
+            start_response('304 Not Modified', headers)
+            return []
+        headers += [
+            ('Content-Type', static.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return wrapper(open(path, 'rb'))
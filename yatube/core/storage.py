@@ -0,0 +1,60 @@
+"""Хранилище статики для production: имена файлов с хешем содержимого
+(ManifestStaticFilesStorage) и заранее сжатые копии.
+
+collectstatic рядом с каждым файлом с хешем текстового типа кладёт
+.gz и, если установлен модуль brotli, .br - только когда сжатие
+действительно уменьшает файл. Сжатые копии отдаёт core.static.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения, которые имеет смысл сжимать: картинки PNG/JPEG уже сжаты
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.html', '.json', '.xml', '.map',
+)
+
+
+def gzip_compress(data):
+    # mtime=0: одинаковый результат при повторном collectstatic
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compressors():
+    """(расширение, функция сжатия) для доступных алгоритмов"""
+    found = [('.gz', gzip_compress)]
+    if brotli is not None:
+        found.append(('.br', brotli.compress))
+    return found
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            yield compressed_name
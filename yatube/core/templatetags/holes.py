@@ -0,0 +1,14 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **kwargs):
+    """Персональный фрагмент страницы (см. core.holes)"""
+    request = context.get('request')
+    if request is not None and holes.is_punched(request):
+        return holes.marker(template_name, kwargs)
+    return holes.render(template_name, kwargs, request)
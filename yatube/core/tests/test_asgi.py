@@ -0,0 +1,277 @@
+import asyncio
+import gzip
+import json
+import re
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import views
+from posts.models import Group, Post
+
+from ..asgi import ASGIHandler, build_environ
+
+User = get_user_model()
+
+
+class CallOnlyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+
+def call(app, path, method='GET', headers=(), body=b'', chunks=1):
+    """Запрос к ASGI-приложению: (статус, заголовки, тело)"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [
+            (name.encode(), value.encode()) for name, value in headers
+        ],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    size = max(len(body) // chunks, 1)
+    parts = [body[i:i + size] for i in range(0, len(body), size)] or [b'']
+    incoming = [
+        {'type': 'http.request', 'body': part,
+         'more_body': number < len(parts) - 1}
+        for number, part in enumerate(parts)
+    ]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    headers = {
+        name.decode().lower(): value.decode()
+        for name, value in start['headers']
+    }
+    content = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], headers, content
+
+
+class ASGIHandlerTests(TransactionTestCase):
+    '''Пул потоков работает с БД из других потоков: нужны закоммиченные
+    данные, поэтому TransactionTestCase'''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_user')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-'
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.app = ASGIHandler()
+
+    def test_async_views(self):
+        '''Страницы из ASYNC_VIEWS обслуживают асинхронные view'''
+        urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        with mock.patch('posts.views.render') as sync_render:
+            for url in urls:
+                with self.subTest(url=url):
+                    status, headers, content = call(self.app, url)
+                    self.assertEqual(status, 200)
+                    self.assertIn('Тестовый пост', content.decode())
+                    self.assertIn('etag', headers)
+                    # Заголовки middleware из хуков process_response
+                    self.assertEqual(headers['x-frame-options'], 'SAMEORIGIN')
+        sync_render.assert_not_called()
+
+    def test_db_work_off_event_loop(self):
+        '''Запросы к БД выполняются не в потоке цикла событий'''
+        loop_thread = threading.get_ident()
+        threads = set()
+        original = views.get_page_obj
+
+        def get_page_obj(*args, **kwargs):
+            threads.add(threading.get_ident())
+            return original(*args, **kwargs)
+
+        with mock.patch.object(views, 'get_page_obj', get_page_obj):
+            call(self.app, reverse('posts:homepage'))
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_not_modified(self):
+        '''Условный GET к асинхронной странице отвечает 304'''
+        url = reverse('posts:homepage')
+        _, headers, _ = call(self.app, url)
+        status, not_modified, content = call(
+            self.app, url, headers=[('If-None-Match', headers['etag'])]
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(content, b'')
+        self.assertEqual(not_modified['etag'], headers['etag'])
+
+    def test_not_found(self):
+        '''Исключение асинхронной view превращается в ответ 404'''
+        status, _, _ = call(self.app, reverse(
+            'posts:group_posts', kwargs={'slug': 'missing'}
+        ))
+        self.assertEqual(status, 404)
+
+    def test_hook_exceptions(self):
+        '''Исключение в хуке middleware превращается в ответ 500'''
+        url = reverse('posts:homepage')
+        for hook in ('process_request', 'process_response'):
+            middleware = next(
+                middleware for middleware in self.app.hooks
+                if hasattr(middleware, hook)
+            )
+            with self.subTest(hook=hook), mock.patch.object(
+                middleware, hook, side_effect=RuntimeError
+            ), self.assertLogs('django.request', 'ERROR'):
+                status, _, _ = call(self.app, url)
+                self.assertEqual(status, 500)
+
+    def test_hooks_share_middleware_chain(self):
+        '''Хуки - те же экземпляры middleware, что и в обычном стеке'''
+        chain = self.app.handler.middleware
+        self.assertTrue(self.app.hooks)
+        for middleware in self.app.hooks:
+            self.assertTrue(
+                any(middleware is instance for instance in chain)
+            )
+            self.assertIsNotNone(middleware.get_response)
+
+    @override_settings(MIDDLEWARE=[
+        *settings.MIDDLEWARE, 'core.tests.test_asgi.CallOnlyMiddleware'
+    ])
+    def test_call_only_middleware(self):
+        '''Middleware только с __call__ не запускается с ASYNC_VIEWS'''
+        with self.assertRaisesMessage(
+            ImproperlyConfigured, 'CallOnlyMiddleware'
+        ):
+            ASGIHandler()
+        with override_settings(ASYNC_VIEWS={}):
+            ASGIHandler()
+
+    @override_settings(PROFILING=True)
+    def test_profiling(self):
+        '''Профиль асинхронной view учитывает запросы из пула потоков'''
+        _, headers, _ = call(ASGIHandler(), reverse('posts:homepage'))
+        queries = re.search(r'"(\d+) queries', headers['server-timing'])
+        self.assertGreater(int(queries.group(1)), 0)
+
+    def test_connections_checked_once_per_thread(self):
+        '''Устаревшие соединения проверяются раз за запрос в каждом
+        потоке пула, а не перед каждым шагом'''
+        threads = []
+        with mock.patch(
+            'core.asgi.close_old_connections',
+            lambda: threads.append(threading.get_ident()),
+        ):
+            call(self.app, reverse('posts:homepage'))
+        self.assertTrue(threads)
+        self.assertEqual(len(threads), len(set(threads)))
+
+    def test_sync_views_use_full_stack(self):
+        '''Прочие страницы идут через обычный стек middleware'''
+        status, _, content = call(self.app, reverse('about:author'))
+        self.assertEqual(status, 200)
+        # CSRF-защита работает: POST без токена отклоняется
+        status, _, _ = call(
+            self.app, reverse('login'), method='POST',
+            headers=[('Content-Type', 'application/x-www-form-urlencoded')],
+            body=b'username=test_user&password=secret', chunks=3,
+        )
+        self.assertEqual(status, 403)
+
+    def test_session_and_streaming(self):
+        '''Сессия из cookie и потоковый ответ'''
+        self.user.is_staff = True
+        self.user.save()
+        client = Client()
+        client.force_login(self.user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        status, headers, content = call(
+            self.app, reverse('posts:export'),
+            headers=[('Cookie', f'{settings.SESSION_COOKIE_NAME}={session}')]
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(content)['text'], 'Тестовый пост')
+
+    @override_settings(POSTS_PAGE_CACHE=True, POSTS_PAGE_CACHE_HOLES=True)
+    def test_hole_punched_cache(self):
+        '''Общая копия страницы получает шапку каждого пользователя'''
+        client = Client()
+        client.force_login(self.user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        url = reverse('posts:homepage')
+        call(self.app, url)
+        for _ in range(2):
+            _, _, content = call(self.app, url, headers=[
+                ('Cookie', f'{settings.SESSION_COOKIE_NAME}={session}')
+            ])
+            self.assertIn('Пользователь: test_user', content.decode())
+            self.assertNotIn('<!--hole:', content.decode())
+
+    @override_settings(RESPONSE_COMPRESSION=True)
+    def test_compression(self):
+        '''Ответ асинхронной view сжимается CompressionMiddleware'''
+        status, headers, content = call(
+            ASGIHandler(), reverse('posts:homepage'),
+            headers=[('Accept-Encoding', 'gzip')],
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-encoding'], 'gzip')
+        self.assertIn('Тестовый пост', gzip.decompress(content).decode())
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+    def test_environ(self):
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/группа/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+            ],
+        }, None)
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/группа/'
+        )
@@ -0,0 +1,216 @@
+import gzip
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import compression
+from ..signals import response_compressed
+
+User = get_user_model()
+
+
+class MinifyHTMLTests(SimpleTestCase):
+
+    def test_collapse_whitespace(self):
+        html = '<div>\n    <p>Текст   поста</p>\n\n\n  <a>ссылка</a>  </div>'
+        self.assertEqual(
+            compression.minify_html(html),
+            '<div>\n<p>Текст поста</p>\n<a>ссылка</a> </div>'
+        )
+
+    def test_preserved_blocks(self):
+        '''Содержимое pre, textarea, script и style не меняется'''
+        for tag in ('pre', 'textarea', 'script', 'STYLE'):
+            with self.subTest(tag=tag):
+                block = f'<{tag} class="x">  a\n\n    b  </{tag}>'
+                self.assertEqual(
+                    compression.minify_html(f'<p>\n  {block}\n  </p>'),
+                    f'<p>\n{block}\n</p>'
+                )
+
+    def test_non_breaking_space(self):
+        self.assertEqual(
+            compression.minify_html('a\xa0\xa0\xa0b'), 'a\xa0\xa0\xa0b'
+        )
+
+    def test_tags_unchanged(self):
+        '''Пробелы внутри тегов и комментариев значимы'''
+        tags = (
+            '<input value="a   b"\n       title=\'x  >  y\'>',
+            '<!--  комментарий\n\n  -->',
+        )
+        for tag in tags:
+            with self.subTest(tag=tag):
+                self.assertEqual(
+                    compression.minify_html(f'<p>\n  {tag}   текст</p>'),
+                    f'<p>\n{tag} текст</p>'
+                )
+
+
+class CompressStreamTests(SimpleTestCase):
+
+    def test_flush_after_buffer(self):
+        '''Мелкие части сбрасываются клиенту порциями, а не по одной'''
+        chunks = [f'{{"id": {number}}}\n'.encode() for number in range(5000)]
+        data = b''.join(chunks)
+        parts = list(compression.compress_stream(
+            chunks, compression.GzipCompressor
+        ))
+        self.assertLess(
+            len(parts), len(data) // compression.STREAM_FLUSH_SIZE + 3
+        )
+        self.assertEqual(gzip.decompress(b''.join(parts)), data)
+
+    def test_flush_size(self):
+        '''Сброс после 3-й, 6-й и 9-й части и завершение потока'''
+        def fake():
+            return SimpleNamespace(
+                compress=lambda data: b'',
+                flush=lambda: b'flush',
+                finish=lambda: b'finish',
+            )
+
+        parts = list(compression.compress_stream(
+            [b'a' * 100] * 10, fake, flush_size=250
+        ))
+        self.assertEqual(parts, [b'flush'] * 3 + [b'finish'])
+
+
+@override_settings(
+    RESPONSE_MINIFY_HTML=True,
+    RESPONSE_COMPRESSION=True,
+    RESPONSE_COMPRESSION_MIN_SIZE=512,
+)
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        for number in range(5):
+            Post.objects.create(
+                author=cls.user, text=f'Тестовый пост {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:homepage')
+        self.reports = []
+        response_compressed.connect(self.record)
+        self.addCleanup(response_compressed.disconnect, self.record)
+
+    def record(self, sender, **kwargs):
+        self.reports.append(kwargs)
+
+    def test_gzip(self):
+        '''Лента сжимается gzip, ETag становится слабым'''
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
+        html = gzip.decompress(response.content).decode()
+        self.assertIn('Тестовый пост 4', html)
+        self.assertNotIn('\n\n', html)
+        # Внутри тегов пробелы не меняются
+        self.assertNotIn('  ', compression.PRESERVED.sub('', html))
+
+    def test_weak_etag_not_modified(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        response = self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_brotli_preferred(self):
+        '''С модулем brotli клиент, принимающий br, получает br'''
+        fake = SimpleNamespace(
+            MODE_TEXT=1,
+            Compressor=lambda **kwargs: SimpleNamespace(
+                process=lambda data: b'',
+                flush=lambda: b'',
+                finish=lambda: b'br',
+            ),
+        )
+        with mock.patch.object(compression, 'brotli', fake):
+            response = self.client.get(
+                self.url, HTTP_ACCEPT_ENCODING='gzip, br'
+            )
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, b'br')
+
+    def test_identity(self):
+        '''Без Accept-Encoding страница только минифицируется'''
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn(b'\n\n', response.content)
+        report, = self.reports
+        self.assertIsNone(report['encoding'])
+        self.assertLess(report['minified_size'], report['original_size'])
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_SIZE=10 ** 7)
+    def test_min_size(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Тестовый пост 4', response.content.decode())
+
+    def test_report(self):
+        '''Сигнал сообщает размеры ответа и имя view'''
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        report, = self.reports
+        self.assertEqual(report['view_name'], 'posts:homepage')
+        self.assertEqual(report['encoding'], 'gzip')
+        self.assertEqual(report['compressed_size'], len(response.content))
+        self.assertLess(report['minified_size'], report['original_size'])
+        self.assertLess(report['compressed_size'], report['minified_size'])
+
+    def test_streaming(self):
+        '''Потоковый ответ сжимается по частям, сигнал - после конца'''
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(
+            reverse('posts:export'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(self.reports, [])
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+        report, = self.reports
+        self.assertEqual(report['view_name'], 'posts:export')
+        self.assertEqual(report['original_size'], len(content))
+
+    def test_small_response(self):
+        '''Ответ меньше порога не сжимается, но попадает в отчёт'''
+        response = self.client.get(
+            reverse('posts:group_search'), {'q': 'x'},
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        report, = self.reports
+        self.assertEqual(report['view_name'], 'posts:group_search')
+        self.assertEqual(report['compressed_size'], len(response.content))
+
+    def test_compressible_types(self):
+        for content_type in ('text/html; charset=utf-8', 'application/json'):
+            self.assertTrue(compression.is_compressible(content_type))
+        self.assertFalse(compression.is_compressible('image/png'))
+
+    @override_settings(
+        RESPONSE_MINIFY_HTML=False, RESPONSE_COMPRESSION=False
+    )
+    def test_disabled(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'\n\n', response.content)
+        self.assertEqual(self.reports, [])
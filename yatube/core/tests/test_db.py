@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.contrib.sessions.models import Session
+from django.db import connections, transaction
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,
+    'cache_size': -2000,
+    'mmap_size': 1024 * 1024,
+}
+WRITERS = 4
+READERS = 4
+ROWS_PER_WRITER = 50
+
+CONCURRENT = 'concurrent_test'
+
+
+@override_settings(SQLITE_PRAGMAS=PRAGMAS)
+class SqlitePragmasTests(SimpleTestCase):
+    '''Соединения с файлом SQLite, как у воркеров в production'''
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.settings_dict = dict(
+            connections['default'].settings_dict,
+            NAME=os.path.join(self.temp_dir, 'db.sqlite3'),
+        )
+
+    def connect(self):
+        """Отдельное соединение, как в новом потоке или воркере"""
+        wrapper = connections['default'].__class__(
+            self.settings_dict, alias='pragmas'
+        )
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        '''PRAGMA выставляются при создании соединения'''
+        wrapper = self.connect()
+        self.addCleanup(wrapper.close)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        # synchronous=NORMAL - это 1
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 10000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2000)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 1024 * 1024)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas(self):
+        '''Без SQLITE_PRAGMAS журнал остаётся по умолчанию'''
+        wrapper = self.connect()
+        self.addCleanup(wrapper.close)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+
+@override_settings(SQLITE_PRAGMAS=PRAGMAS)
+class SqliteConcurrencyTests(SimpleTestCase):
+    '''Запись и чтение через ORM из нескольких потоков, как у воркеров'''
+    databases = {CONCURRENT}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        connections.databases[CONCURRENT] = dict(
+            connections['default'].settings_dict,
+            NAME=os.path.join(cls.temp_dir, 'db.sqlite3'),
+        )
+        super().setUpClass()
+        # Модель без обработчиков сигналов: запись не трогает другие БД
+        with connections[CONCURRENT].schema_editor() as editor:
+            editor.create_model(Session)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[CONCURRENT].close()
+        del connections[CONCURRENT]
+        del connections.databases[CONCURRENT]
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def sessions(self):
+        return Session.objects.using(CONCURRENT)
+
+    def write(self, number, errors):
+        try:
+            for i in range(ROWS_PER_WRITER):
+                # Короткая транзакция на каждую запись, как у save_edit
+                with transaction.atomic(using=CONCURRENT):
+                    self.sessions().create(
+                        session_key=f'writer_{number}_{i}',
+                        session_data='',
+                        expire_date=timezone.now(),
+                    )
+        except Exception as error:
+            errors.append(error)
+        finally:
+            # У каждого потока своё соединение
+            connections[CONCURRENT].close()
+
+    def read(self, done, reads, errors):
+        try:
+            while not done.is_set():
+                with transaction.atomic(using=CONCURRENT):
+                    reads.append(self.sessions().count())
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections[CONCURRENT].close()
+
+    def test_parallel_writers_and_readers(self):
+        '''Параллельные запись и чтение проходят без «database is locked»'''
+        errors = []
+        reads = []
+        writers_done = threading.Event()
+        writers = [
+            threading.Thread(target=self.write, args=(number, errors))
+            for number in range(WRITERS)
+        ]
+        readers = [
+            threading.Thread(
+                target=self.read, args=(writers_done, reads, errors)
+            )
+            for _ in range(READERS)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        writers_done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(reads)
+        self.assertEqual(
+            self.sessions().count(), WRITERS * ROWS_PER_WRITER
+        )
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+from ..middleware import STICKY_COOKIE
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA], REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTests(TransactionTestCase):
+    '''Реплика - копия тестовой БД в отдельном файле SQLite'''
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections['default'].settings_dict,
+            NAME=os.path.join(cls.temp_dir, 'replica.sqlite3'),
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user')
+        Post.objects.create(author=self.user, text='Скопированный пост')
+        call_command('sync_replica', stdout=StringIO())
+        # Этого поста в реплике ещё нет: она «отстаёт»
+        self.new_post = Post.objects.create(
+            author=self.user, text='Свежий пост'
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_feed_reads_from_replica(self):
+        '''Ленты и страница поста читают из реплики'''
+        response = self.client.get(reverse('posts:homepage'))
+        self.assertContains(response, 'Скопированный пост')
+        self.assertNotContains(response, 'Свежий пост')
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.new_post.pk}
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_group_list_read_from_primary(self):
+        '''Список групп не кэшируется из отстающей реплики'''
+        Group.objects.create(
+            title='Новая группа', slug='new_group', description='-'
+        )
+        response = self.client.get(reverse(
+            'posts:group_posts', kwargs={'slug': 'new_group'}
+        ))
+        self.assertContains(response, 'Новая группа')
+
+    def test_session_read_from_primary(self):
+        '''Сессия, которой нет в реплике, всё равно находится'''
+        response = self.author_client.get(reverse('posts:homepage'))
+        self.assertContains(response, 'Выйти')
+
+    def test_other_views_read_from_primary(self):
+        '''Страницы не из REPLICA_READ_VIEWS читают из основной БД'''
+        response = self.author_client.get(reverse(
+            'posts:post_edit', kwargs={'post_id': self.new_post.pk}
+        ))
+        self.assertEqual(response.status_code, 200)
+
+    def test_reads_stick_to_primary_after_write(self):
+        '''После записи пользователь видит свои изменения'''
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Только что написан'}
+        )
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = self.author_client.get(reverse('posts:homepage'))
+        self.assertContains(response, 'Только что написан')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_sticky_window_expires(self):
+        '''По истечении окна чтения снова идут в реплику'''
+        self.author_client.cookies[STICKY_COOKIE] = '0'
+        response = self.author_client.get(reverse('posts:homepage'))
+        self.assertNotContains(response, 'Свежий пост')
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..profiling import RequestProfile, fingerprint
+
+User = get_user_model()
+
+
+@override_settings(PROFILING=True)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.url = reverse('posts:homepage')
+
+    def test_server_timing_header(self):
+        '''Ответ содержит Server-Timing с SQL, шаблонами и view'''
+        response = self.client.get(self.url)
+        timing = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'view;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_staff_report(self):
+        '''Персонал получает JSON-отчёт с запросами и шаблонами'''
+        response = self.staff_client.get(self.url, {'_profile': 'json'})
+        report = response.json()
+        self.assertGreater(report['sql']['count'], 0)
+        self.assertEqual(
+            report['sql']['count'], len(report['sql']['queries'])
+        )
+        self.assertIn('posts/index.html', report['templates']['by_name'])
+        self.assertIn(
+            'posts/includes/post_card.html', report['templates']['by_name']
+        )
+        self.assertGreaterEqual(report['view_ms'], report['sql']['time_ms'])
+
+    def test_report_closed_for_others(self):
+        '''Гость по ?_profile=json получает обычную страницу'''
+        response = self.client.get(self.url, {'_profile': 'json'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+    @override_settings(PROFILING=False)
+    def test_disabled(self):
+        '''Без PROFILING заголовка и отчёта нет'''
+        response = self.staff_client.get(self.url, {'_profile': 'json'})
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+
+class RequestProfileTests(TestCase):
+    def test_duplicates_by_fingerprint(self):
+        '''Запросы, отличающиеся только параметрами, считаются повторами'''
+        profile = RequestProfile()
+        profile.queries = [
+            ('SELECT * FROM t WHERE id = %s', 0.001),
+            ('SELECT * FROM t WHERE id = %s', 0.001),
+            ('SELECT * FROM t WHERE id IN (%s)', 0.001),
+            ('SELECT * FROM t WHERE id IN (%s, %s)', 0.001),
+            ('SELECT 1', 0.001),
+        ]
+        self.assertEqual(profile.duplicates(), {
+            'SELECT * FROM t WHERE id = %s': 2,
+            'SELECT * FROM t WHERE id IN (...)': 2,
+        })
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE a IN (%s, %s,%s) AND b = %s'),
+            'SELECT 1 WHERE a IN (...) AND b = %s'
+        )
@@ -0,0 +1,198 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+from wsgiref.util import setup_testing_defaults
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from .. import storage
+from ..static import IMMUTABLE_CACHE_CONTROL, StaticFilesApp
+
+STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+
+def collect(root):
+    with override_settings(STATIC_ROOT=root, STATICFILES_STORAGE=STORAGE):
+        call_command('collectstatic', interactive=False, verbosity=0)
+    with open(os.path.join(root, 'staticfiles.json')) as manifest:
+        return json.load(manifest)['paths']
+
+
+def call(app, path, method='GET', **headers):
+    """Запрос к WSGI-приложению: (статус, заголовки, тело)"""
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': method}
+    environ.update(
+        (f'HTTP_{name.upper()}', value) for name, value in headers.items()
+    )
+    setup_testing_defaults(environ)
+    started = {}
+
+    def start_response(status, response_headers):
+        started['status'] = int(status.split()[0])
+        started['headers'] = dict(response_headers)
+
+    body = b''.join(app(environ, start_response))
+    return started['status'], started['headers'], body
+
+
+def django_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+class CollectStaticTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_hashed_and_compressed(self):
+        '''collectstatic добавляет хеш к именам и сжимает текстовые файлы'''
+        paths = collect(self.root)
+        css = paths['css/bootstrap.min.css']
+        self.assertRegex(css, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, css), 'rb') as original:
+            data = original.read()
+        with gzip.open(os.path.join(self.root, css + '.gz')) as compressed:
+            self.assertEqual(compressed.read(), data)
+        # PNG уже сжат: копия .gz не нужна
+        logo = paths['img/logo.png']
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, logo + '.gz'))
+        )
+
+    def test_brotli(self):
+        '''С модулем brotli рядом с .gz появляется .br'''
+        fake = SimpleNamespace(compress=lambda data: b'br')
+        with mock.patch.object(storage, 'brotli', fake):
+            css = collect(self.root)['css/bootstrap.min.css']
+        with open(os.path.join(self.root, css + '.br'), 'rb') as compressed:
+            self.assertEqual(compressed.read(), b'br')
+
+    def test_without_brotli(self):
+        with mock.patch.object(storage, 'brotli', None):
+            css = collect(self.root)['css/bootstrap.min.css']
+        self.assertFalse(os.path.exists(os.path.join(self.root, css + '.br')))
+
+    def test_templates_use_hashed_names(self):
+        collect(self.root)
+        with override_settings(
+            STATIC_ROOT=self.root, STATICFILES_STORAGE=STORAGE
+        ):
+            response = self.client.get('/about/author/')
+        self.assertRegex(
+            response.content.decode(),
+            r'/static/css/bootstrap\.min\.[0-9a-f]{12}\.css'
+        )
+
+
+class StaticFilesAppTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.paths = collect(cls.root)
+        cls.app = StaticFilesApp(django_app, cls.root, '/static/', 60)
+        cls.css = '/static/' + cls.paths['css/bootstrap.min.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), 'rb') as static:
+            return static.read()
+
+    def test_precompressed(self):
+        '''Клиент со сжатием получает готовую копию .gz'''
+        status, headers, body = call(
+            self.app, self.css, accept_encoding='gzip, deflate'
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertEqual(
+            gzip.decompress(body),
+            self.read(self.paths['css/bootstrap.min.css'])
+        )
+
+    def test_identity(self):
+        '''Без сжатия и при q=0 отдаётся исходный файл'''
+        for accept in ('', 'gzip;q=0', 'identity'):
+            with self.subTest(accept=accept):
+                _, headers, body = call(
+                    self.app, self.css, accept_encoding=accept
+                )
+                self.assertNotIn('Content-Encoding', headers)
+                self.assertEqual(
+                    body, self.read(self.paths['css/bootstrap.min.css'])
+                )
+
+    def test_cache_control(self):
+        '''Файлы с хешем кэшируются навсегда, без хеша - ненадолго'''
+        _, headers, _ = call(self.app, self.css)
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        _, headers, _ = call(self.app, '/static/css/bootstrap.min.css')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=60')
+
+    def test_not_modified(self):
+        _, headers, _ = call(self.app, self.css)
+        status, _, body = call(
+            self.app, self.css, if_modified_since=headers['Last-Modified']
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+        status, _, _ = call(
+            self.app, self.css, if_modified_since=http_date(0)
+        )
+        self.assertEqual(status, 200)
+
+    def test_head(self):
+        status, headers, body = call(self.app, self.css, method='HEAD')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'')
+        self.assertEqual(
+            int(headers['Content-Length']),
+            len(self.read(self.paths['css/bootstrap.min.css']))
+        )
+
+    def test_other_requests_reach_django(self):
+        '''Чужие пути, выход за STATIC_ROOT, сжатые копии, манифест и
+        POST обслуживает Django'''
+        paths = (
+            '/',
+            '/static/missing.css',
+            '/static/../yatube/settings.py',
+            self.css + '.gz',
+            '/static/staticfiles.json',
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(call(self.app, path)[2], b'django')
+        self.assertEqual(call(self.app, self.css, 'POST')[2], b'django')
+
+    def test_file_wrapper(self):
+        '''Тело отдаётся через wsgi.file_wrapper сервера'''
+        wrapped = []
+
+        def file_wrapper(file, block_size=8192):
+            wrapped.append(file.name)
+            with file:
+                return [file.read()]
+
+        environ = {'PATH_INFO': self.css, 'wsgi.file_wrapper': file_wrapper}
+        setup_testing_defaults(environ)
+        self.app(environ, lambda status, headers: None)
+        self.assertEqual(wrapped, [
+            os.path.join(self.root, self.paths['css/bootstrap.min.css'])
+        ])
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.template.base import Parser
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..checks import check_template_syntax
+from ..warmup import project_template_names, warm_on_startup
+
+CACHED_TEMPLATES = [dict(
+    settings.TEMPLATES[0],
+    OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[(
+        'django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]
+    )]),
+)]
+
+
+class TemplateWarmupTests(TestCase):
+    def setUp(self):
+        self.broken_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.broken_dir)
+        with open(os.path.join(self.broken_dir, 'broken.html'), 'w') as f:
+            f.write('{% if %}')
+        self.broken_templates = [dict(
+            CACHED_TEMPLATES[0],
+            DIRS=[*CACHED_TEMPLATES[0]['DIRS'], self.broken_dir]
+        )]
+
+    def test_project_templates_only(self):
+        names = project_template_names(engines['django'])
+        for name in (
+            'base.html', 'includes/header.html', 'posts/index.html',
+            'posts/includes/post_card.html', 'users/login.html',
+        ):
+            self.assertIn(name, names)
+        self.assertNotIn('admin/base.html', names)
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_pages_render_without_parsing(self):
+        '''После прогрева первый запрос не разбирает шаблоны'''
+        call_command('warm_templates', stdout=StringIO())
+        with mock.patch.object(
+            Parser, 'parse', side_effect=AssertionError
+        ):
+            for url in (
+                reverse('posts:homepage'), reverse('about:author')
+            ):
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_syntax_check(self):
+        self.assertEqual(check_template_syntax(None), [])
+        with self.settings(TEMPLATES=self.broken_templates):
+            errors = check_template_syntax(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertEqual(errors[0].obj, 'broken.html')
+
+    def test_startup_fails_fast(self):
+        with self.settings(
+            TEMPLATES=self.broken_templates, TEMPLATES_WARM_ON_STARTUP=True
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                warm_on_startup()
+            with self.assertRaises(CommandError):
+                call_command('warm_templates', stdout=StringIO())
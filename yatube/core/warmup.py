@@ -0,0 +1,72 @@
+"""Компиляция всех шаблонов проекта при запуске процесса.
+
+С кэширующим загрузчиком (TEMPLATES_CACHED) скомпилированные шаблоны
+остаются в памяти процесса, и первый запрос каждого воркера не тратит
+время на разбор base.html, шапки, подвала и прочих включений.
+Шаблоны проекта - это каталоги DIRS и templates/ приложений из BASE_DIR;
+шаблоны сторонних приложений (админка и т.п.) компилируются как обычно,
+при первом обращении.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+
+
+def project_template_dirs(backend):
+    app_dirs = [
+        path for path in get_app_template_dirs('templates')
+        if path.startswith(settings.BASE_DIR)
+    ]
+    return [str(path) for path in (*backend.dirs, *app_dirs)]
+
+
+def project_template_names(backend):
+    """Имена шаблонов проекта в порядке поиска, без повторов"""
+    names = {}
+    for directory in project_template_dirs(backend):
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+            for filename in sorted(files):
+                if filename.startswith('.'):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), directory)
+                names.setdefault(name.replace(os.sep, '/'), None)
+    return list(names)
+
+
+def compile_templates():
+    """Компиляция шаблонов проекта: (число шаблонов, [(имя, ошибка)])"""
+    count = 0
+    errors = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in project_template_names(backend):
+            count += 1
+            try:
+                backend.engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors.append((name, error))
+    return count, errors
+
+
+def warm_templates():
+    """Компиляция шаблонов при запуске; ошибка в шаблоне не даёт
+    процессу запуститься. Возвращает (число шаблонов, секунды)"""
+    start = time.perf_counter()
+    count, errors = compile_templates()
+    if errors:
+        name, error = errors[0]
+        raise ImproperlyConfigured(f'Ошибка в шаблоне {name}: {error}')
+    return count, time.perf_counter() - start
+
+
+def warm_on_startup():
+    """Прогрев из точки входа WSGI/ASGI при TEMPLATES_WARM_ON_STARTUP"""
+    if settings.TEMPLATES_WARM_ON_STARTUP:
+        warm_templates()
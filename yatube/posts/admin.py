@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import search_posts
 
 
 @admin.register(Post)
@@ -22,5 +23,11 @@ class PostAdmin(admin.ModelAdmin):
     # Свойство для пустых полей
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идёт по индексу posts.search, а не LIKE по всей таблице
+        if not search_term:
+            return queryset, False
+        return search_posts(search_term, queryset), False
+
 
 admin.site.register(Group)
@@ -0,0 +1,103 @@
+"""Асинхронные версии страниц, которые только читают данные.
+
+Используются ASGI-обработчиком core.asgi (настройка ASYNC_VIEWS). Логика
+та же, что у синхронных view: кэш страниц, ETag/Last-Modified и
+контекст шаблона берутся из posts.views. Каждый шаг с запросами к БД,
+кэшу или рендером выполняется через run_sync в пуле потоков БД, а цикл
+событий между шагами свободен для других клиентов.
+"""
+from functools import partial
+
+from django.shortcuts import render
+
+from core.asgi import run_sync
+
+from . import cache, views
+from .conditional import (
+    add_validators, check_conditions, feed_page_state, post_state
+)
+
+
+def load_context(get_context, request, **kwargs):
+    """Контекст страницы с уже загруженными постами: рендер после этого
+    не обращается к БД за лентой"""
+    context = get_context(request, **kwargs)
+    if 'page_obj' in context:
+        list(context['page_obj'])
+    return context
+
+
+async def serve(request, kwargs, get_state, get_context, template,
+                get_scopes):
+    """Общий путь страницы: кэш, условный GET, загрузка данных, рендер"""
+    if not cache.is_enabled(request):
+        return await render_page(
+            request, kwargs, get_state, get_context, template
+        )
+    cached, cache_key, versions = await run_sync(
+        cache.lookup, request, partial(get_scopes, **kwargs)
+    )
+    if cached is not None:
+        return cached
+    with cache.rendering(request):
+        response = await render_page(
+            request, kwargs, get_state, get_context, template
+        )
+    return await run_sync(cache.store, request, cache_key, response, versions)
+
+
+async def render_page(request, kwargs, get_state, get_context, template):
+    """Условный GET, загрузка данных и рендер страницы"""
+    etag, last_modified = await run_sync(get_state, request, **kwargs)
+    response, etag, last_modified = check_conditions(
+        request, etag, last_modified
+    )
+    if response is None:
+        context = await run_sync(
+            load_context, get_context, request, **kwargs
+        )
+        response = await run_sync(render, request, template, context)
+    # Как condition(): валидаторы получает и ответ 304
+    return add_validators(request, response, etag, last_modified)
+
+
+def feed_state(get_feed):
+    def get_state(request, **kwargs):
+        return feed_page_state(request, get_feed, **kwargs)
+    return get_state
+
+
+async def index(request):
+    """Главная страница"""
+    return await serve(
+        request, {}, feed_state(views.index_feed), views.index_context,
+        'posts/index.html', cache.index_scope
+    )
+
+
+async def group_posts(request, slug):
+    """Страница группы"""
+    return await serve(
+        request, {'slug': slug}, feed_state(views.group_feed),
+        views.group_context, 'posts/group_list.html', cache.group_scope
+    )
+
+
+async def profile(request, username):
+    """Профиль пользователя"""
+    return await serve(
+        request, {'username': username}, feed_state(views.profile_feed),
+        views.profile_context, 'posts/profile.html', cache.profile_scope
+    )
+
+
+def post_detail_state(request, post_id):
+    return post_state(request, views.post_source, post_id=post_id)
+
+
+async def post_detail(request, post_id):
+    """Страница поста"""
+    return await serve(
+        request, {'post_id': post_id}, post_detail_state,
+        views.post_context, 'posts/post_detail.html', cache.post_page_scope
+    )
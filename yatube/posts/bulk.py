@@ -0,0 +1,20 @@
+"""Помощники массовой загрузки постов в обход Post.save()."""
+from contextlib import contextmanager
+
+from .models import Post
+
+
+@contextmanager
+def preserve_dates():
+    """Отключение auto_now_add/auto_now у дат поста.
+
+    bulk_create вызывает pre_save полей, и без этого все загруженные
+    посты получили бы текущее время вместо исходной даты публикации.
+    """
+    pub_date = Post._meta.get_field('pub_date')
+    updated = Post._meta.get_field('updated')
+    pub_date.auto_now_add = updated.auto_now = False
+    try:
+        yield
+    finally:
+        pub_date.auto_now_add = updated.auto_now = True
@@ -0,0 +1,214 @@
+"""Кэш готовых страниц лент с точечной инвалидацией.
+
+Каждая закэшированная страница помнит версии «областей» (scope), от
+которых она зависит: 'index', 'group:<slug>', 'profile:<username>',
+'post:<id>'. Изменение поста меняет версии только затронутых областей,
+и все их страницы разом становятся устаревшими - без перебора ключей,
+поэтому работает на любом бэкенде кэша Django, включая locmem и файловый.
+
+При POSTS_PAGE_CACHE_HOLES страница кэшируется одна на всех
+пользователей: персональные фрагменты (шапка, кнопка правки) вместо
+рендера оставляют метки (core.holes), которые заполняются для каждого
+запроса. ETag при этом вычисляется для общей страницы и в ответе
+дополняется пользователем.
+"""
+import hashlib
+import uuid
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from core import holes
+
+from . import groups
+from .conditional import personal_etag
+from .models import Post
+
+PAGE_PREFIX = 'posts:page:'
+SCOPE_PREFIX = 'posts:scope:'
+# Параметры запроса, от которых зависит содержимое ленты
+PAGE_PARAMS = ('page', 'cursor')
+# Заголовки-валидаторы, которые сохраняются вместе со страницей
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def index_scope():
+    return ('index',)
+
+
+def group_scope(slug):
+    return (f'group:{slug}',)
+
+
+def profile_scope(username):
+    return (f'profile:{username}',)
+
+
+def post_scope(post_id):
+    return (f'post:{post_id}',)
+
+
+def post_page_scope(post_id):
+    """Области страницы поста: сам пост, профиль автора (счётчик его
+    постов) и группа. Автор и группа находятся лёгким запросом, чтобы
+    версии всех областей читались до рендера"""
+    try:
+        username, group_id = Post.objects.values_list(
+            'author__username', 'group_id'
+        ).get(pk=post_id)
+    except Post.DoesNotExist:
+        return post_scope(post_id)
+    scopes = post_scope(post_id) + profile_scope(username)
+    group = group_id and groups.get_by_pk(group_id)
+    if group:
+        scopes += group_scope(group.slug)
+    return scopes
+
+
+def holes_enabled():
+    return settings.POSTS_PAGE_CACHE_HOLES
+
+
+def get_cache():
+    return caches[settings.POSTS_PAGE_CACHE_ALIAS]
+
+
+def scope_key(scope):
+    return SCOPE_PREFIX + hashlib.md5(scope.encode()).hexdigest()
+
+
+def purge(*scopes):
+    """Сброс всех страниц, зависящих от перечисленных областей"""
+    scopes = {scope for scope in scopes if scope}
+    if scopes:
+        get_cache().set_many(
+            {scope_key(scope): uuid.uuid4().hex for scope in scopes},
+            timeout=None
+        )
+
+
+def get_versions(cache, scopes, create=False):
+    """Текущие версии областей; отсутствующие создаются при create"""
+    keys = {scope_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    if create and len(versions) < len(scopes):
+        missing = {
+            scope_key(scope): uuid.uuid4().hex
+            for scope in scopes if scope not in versions
+        }
+        cache.set_many(missing, timeout=None)
+        versions.update({keys[key]: value for key, value in missing.items()})
+    return versions
+
+
+def page_key(request):
+    """Ключ страницы: путь, номер страницы/курсор и кто смотрит"""
+    # Без «дыр» шапка страницы зависит от пользователя, поэтому у каждого
+    # авторизованного пользователя свои копии страниц
+    if holes_enabled():
+        viewer = 'shared'
+    else:
+        viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    params = '&'.join(
+        f'{name}={request.GET.get(name)}'
+        for name in PAGE_PARAMS if name in request.GET
+    )
+    raw = f'{request.path}?{params}|{viewer}'
+    return PAGE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cached_response(request, entry):
+    """Ответ из записи кэша; при совпадении валидаторов - сразу 304"""
+    headers = dict(entry['headers'])
+    content = entry['content']
+    if entry['holes']:
+        content = holes.fill(content, request)
+        if 'ETag' in headers:
+            headers['ETag'] = personal_etag(request, headers['ETag'])
+    response = HttpResponse(content, content_type=entry['content_type'])
+    for header, value in headers.items():
+        response[header] = value
+    return get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+        response=response,
+    )
+
+
+def lookup(request, get_scopes):
+    """Поиск страницы в кэше: (ответ или None, ключ, версии областей).
+
+    get_scopes() возвращает области страницы и вызывается только при
+    промахе.
+    """
+    cache = get_cache()
+    key = page_key(request)
+    entry = cache.get(key)
+    if entry is not None and (
+        get_versions(cache, entry['versions']) == entry['versions']
+    ):
+        return cached_response(request, entry), key, None
+    # Версии читаем до рендера: если пост изменится во время
+    # рендера, запись сразу окажется устаревшей
+    return None, key, get_versions(cache, get_scopes(), create=True)
+
+
+def rendering(request):
+    """Блок рендера страницы для кэша: с метками вместо фрагментов при
+    POSTS_PAGE_CACHE_HOLES"""
+    return holes.punched(request, holes_enabled())
+
+
+def store(request, key, response, versions):
+    """Сохранение успешного ответа без cookie под ключом key; ответ
+    отрендерен в rendering(request) и здесь получает свои фрагменты"""
+    if response.status_code == 200 and not response.cookies:
+        get_cache().set(key, {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'headers': {
+                header: response[header]
+                for header in VALIDATOR_HEADERS
+                if response.has_header(header)
+            },
+            'versions': versions,
+            'holes': holes_enabled(),
+        }, settings.POSTS_PAGE_CACHE_TIMEOUT)
+    if holes_enabled():
+        if not response.streaming:
+            response.content = holes.fill(response.content, request)
+        if response.has_header('ETag'):
+            response['ETag'] = personal_etag(request, response['ETag'])
+    return response
+
+
+def is_enabled(request):
+    return settings.POSTS_PAGE_CACHE and request.method == 'GET'
+
+
+def cache_feed_page(get_scopes):
+    """Кэширование страницы view, зависящей от областей get_scopes(**kwargs)
+
+    Включается настройкой POSTS_PAGE_CACHE.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_enabled(request):
+                return view(request, *args, **kwargs)
+            cached, key, versions = lookup(
+                request, partial(get_scopes, **kwargs)
+            )
+            if cached is not None:
+                return cached
+            with rendering(request):
+                response = view(request, *args, **kwargs)
+            return store(request, key, response, versions)
+        return wrapper
+    return decorator
@@ -0,0 +1,179 @@
+"""Условные GET-запросы для лент (ETag) и страницы поста (ETag и
+Last-Modified).
+
+У ленты нет Last-Modified: время изменения постов страницы не растёт,
+когда пост удалён или страницы сдвинулись, и клиент с одним
+If-Modified-Since получил бы устаревшую страницу. ETag учитывает состав
+страницы, имена авторов и группы в карточках и число постов.
+
+Валидаторы считаются одним лёгким запросом по id, времени изменения и
+авторам постов показываемой страницы (группы - из кэша групп), поэтому
+ответ 304 отдаётся без загрузки текстов постов и без рендера шаблонов.
+"""
+import hashlib
+import inspect
+from calendar import timegm
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core import holes
+
+from . import groups
+
+
+def request_cached(func):
+    """Однократное вычисление func(request, ...) в рамках запроса.
+
+    Валидаторам и самому view нужны одни и те же объекты - группа,
+    автор, пост; так они загружаются из БД один раз.
+    """
+    attr = f'_request_cached_{func.__module__}.{func.__qualname__}'
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        cached = request.__dict__.setdefault(attr, {})
+        # Позиционные и именованные аргументы дают один и тот же ключ
+        bound = signature.bind(request, *args, **kwargs)
+        key = tuple(
+            (name, tuple(sorted(value.items()))
+             if isinstance(value, dict) else value)
+            for name, value in list(bound.arguments.items())[1:]
+        )
+        if key not in cached:
+            cached[key] = func(request, *args, **kwargs)
+        return cached[key]
+    return wrapper
+
+
+def user_of(request):
+    return request.user.pk if request.user.is_authenticated else 'anon'
+
+
+def viewer_of(request):
+    """Страница различается для гостя и для каждого пользователя; общая
+    страница с метками фрагментов (core.holes) - одна для всех"""
+    if holes.is_punched(request):
+        return 'shared'
+    return user_of(request)
+
+
+def make_etag(request, *parts):
+    raw = '|'.join(str(part) for part in (viewer_of(request),) + parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def personal_etag(request, etag):
+    """ETag общей страницы с персональными фрагментами для request"""
+    raw = f'{user_of(request)}|{etag}'
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional(get_state):
+    """Как condition(), но с валидаторами из одного вызова
+    get_state(request, **kwargs) -> (ETag, Last-Modified)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response, etag, last_modified = check_conditions(
+                request, *get_state(request, **kwargs)
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return add_validators(request, response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+@request_cached
+def card_state(post):
+    """Всё, что выводит карточка поста в ленте: сам пост, имя автора и
+    группа (из кэша групп, как в шаблоне карточки)"""
+    group = groups.get_by_pk(post.group_id)
+    return (
+        post.pk, post.updated.timestamp(), post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else None, group.title if group else None,
+    )
+
+
+def feed_page_state(request, get_feed, **kwargs):
+    """(ETag, None) страницы ленты, которую покажет view: Last-Modified
+    у ленты нет"""
+    # Импорт здесь: views сами используют этот модуль
+    from .views import get_page_obj
+
+    queryset, count, extra = get_feed(request, **kwargs)
+    page_obj = get_page_obj(
+        # author и group нужны фильтрам связанных менеджеров; имя автора
+        # и группа выводятся в карточках
+        queryset.select_related('author').only(
+            'pub_date', 'updated', 'author', 'group', 'author__username',
+            'author__first_name', 'author__last_name',
+        ),
+        request,
+        count
+    )
+    posts = [card_state(post) for post in page_obj]
+    total = getattr(page_obj.paginator, 'count', None)
+    return make_etag(request, posts, total, *extra), None
+
+
+def feed_condition(get_feed):
+    """Поддержка If-None-Match для view ленты.
+
+    get_feed(request, **kwargs) возвращает (queryset постов, известное
+    число постов или None, прочие данные страницы для ETag).
+    """
+    def get_state(request, **kwargs):
+        return feed_page_state(request, get_feed, **kwargs)
+
+    return conditional(get_state)
+
+
+def post_state(request, get_post, **kwargs):
+    """(ETag, Last-Modified) страницы поста"""
+    post, extra = get_post(request, **kwargs)
+    etag = make_etag(request, post.pk, post.updated.timestamp(), *extra)
+    return etag, post.updated
+
+
+def post_condition(get_post):
+    """Валидаторы страницы поста по его времени изменения"""
+    def get_state(request, **kwargs):
+        return post_state(request, get_post, **kwargs)
+
+    return conditional(get_state)
+
+
+def check_conditions(request, etag, last_modified):
+    """Проверка валидаторов запроса, как в condition(): (ответ 304/412
+    или None, ETag, Last-Modified для ответа).
+
+    Общая страница для кэша (core.holes) уйдёт клиенту с персональным
+    ETag (personal_etag), поэтому и If-None-Match сравнивается с ним:
+    иначе при промахе кэша клиент никогда не получил бы 304.
+    """
+    res_etag = quote_etag(etag) if etag is not None else None
+    res_last_modified = (
+        timegm(last_modified.utctimetuple()) if last_modified else None
+    )
+    compared_etag = res_etag
+    if res_etag is not None and holes.is_punched(request):
+        compared_etag = personal_etag(request, res_etag)
+    response = get_conditional_response(
+        request, etag=compared_etag, last_modified=res_last_modified
+    )
+    return response, res_etag, res_last_modified
+
+
+def add_validators(request, response, etag, last_modified):
+    """Заголовки ETag и Last-Modified к ответу, как в condition()"""
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.setdefault('ETag', etag)
+    return response
@@ -0,0 +1,89 @@
+"""Потоковая выгрузка постов в JSON Lines или CSV.
+
+Посты читаются через iterator(chunk_size=...), а строки файла отдаются
+генератором, поэтому расход памяти не зависит от размера таблицы.
+Формат совместим с командой import_posts.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('text', 'author', 'group', 'pub_date')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CHUNK_SIZE = 2000
+
+
+def parse_bound(value, upper=False):
+    """Граница периода из даты или даты со временем.
+
+    Для верхней границы дата без времени означает конец этого дня.
+    Возвращает (момент, включительно ли) или ValueError.
+    """
+    moment = parse_datetime(value)
+    if moment is not None:
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment, True
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'Некорректная дата: {value!r}')
+    if upper:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min)), not upper
+
+
+def export_queryset(since=None, until=None, group=None, author=None):
+    """Выгружаемые посты: период по pub_date, slug группы, автор"""
+    queryset = Post.objects.order_by('pk')
+    if since:
+        moment, _ = parse_bound(since)
+        queryset = queryset.filter(pub_date__gte=moment)
+    if until:
+        moment, inclusive = parse_bound(until, upper=True)
+        lookup = 'pub_date__lte' if inclusive else 'pub_date__lt'
+        queryset = queryset.filter(**{lookup: moment})
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    if author:
+        queryset = queryset.filter(author__username=author)
+    return queryset.values_list(
+        'text', 'author__username', 'group__slug', 'pub_date'
+    )
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    for text, author, group, pub_date in queryset.iterator(chunk_size):
+        yield {
+            'text': text,
+            'author': author,
+            'group': group or '',
+            'pub_date': pub_date.isoformat(),
+        }
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанное, а не хранит"""
+
+    def write(self, value):
+        return value
+
+
+def render(rows, file_format):
+    """Строки файла в заданном формате по одной"""
+    if file_format == 'csv':
+        writer = csv.DictWriter(Echo(), FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
@@ -1,8 +1,41 @@
 from django import forms
+from django.urls import reverse_lazy
 
+from . import groups
 from .models import Post
 
 
+class GroupSearchWidget(forms.Select):
+    """Выбор группы с поиском по мере ввода.
+
+    В разметку попадает только выбранная группа, а не все группы;
+    подходящие варианты скрипт js/group_search.js запрашивает у
+    posts:group_search.
+    """
+
+    class Media:
+        js = ('js/group_search.js',)
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            'data-search-url': reverse_lazy('posts:group_search'),
+            **(attrs or {}),
+        })
+
+    def optgroups(self, name, value, attrs=None):
+        field = getattr(self.choices, 'field', None)
+        empty_label = getattr(field, 'empty_label', None) or '---------'
+        selected = [item for item in value if item]
+        options = [self.create_option(name, '', empty_label, not selected, 0)]
+        for index, pk in enumerate(selected, start=1):
+            group = groups.get_by_pk(int(pk)) if pk.isdigit() else None
+            if group is not None:
+                options.append(self.create_option(
+                    name, str(group.pk), str(group), True, index
+                ))
+        return [(None, options, 0)]
+
+
 class PostForm(forms.ModelForm):
 
     class Meta:
@@ -15,6 +48,11 @@ class PostForm(forms.ModelForm):
         help_texts = {
             'text': ('Текст поста не может быть пустым')
         }
+        # Поле остаётся ModelChoiceField: проверка ищет в БД только
+        # выбранную группу, а список групп не строится
+        widgets = {
+            'group': GroupSearchWidget,
+        }
 
     def clean_text(self):
         data = self.cleaned_data['text']
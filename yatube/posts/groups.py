@@ -0,0 +1,167 @@
+"""Кэш групп: поиск по slug и по id и полный список без запросов к БД.
+
+Группы меняются редко, а нужны почти каждой странице: ленте группы,
+карточкам постов, форме поста. Список хранится в общем кэше Django
+(POSTS_GROUP_CACHE_ALIAS) и в памяти процесса. Копия в памяти
+действительна, пока совпадает версия списка в общем кэше, поэтому
+сброс (invalidate) из любого процесса виден всем процессам.
+
+Список читается из основной БД, а не из реплики (core.db_router):
+отстающая реплика не должна попасть в кэш. Версия и список живут
+POSTS_GROUP_CACHE_TIMEOUT секунд, поэтому и пропущенный сброс не
+оставляет устаревший список навсегда.
+
+Сбрасывают кэш сигналы posts.signals: сохранение и удаление группы,
+в том числе из админки. Счётчик постов меняется с каждым постом, поэтому
+в список не попадает (поле отложено): у каждой группы свой ключ
+счётчика (posts_count), и новый пост сбрасывает только его.
+"""
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.core.cache import caches
+from django.db import transaction
+from django.http import Http404
+
+from .models import Group
+
+VERSION_KEY = 'posts:groups:version'
+LIST_KEY = 'posts:groups:list'
+COUNT_KEY = 'posts:groups:count:{}'
+# Сколько групп возвращает поиск по началу названия
+SEARCH_LIMIT = 20
+# Верхняя граница диапазона строк с заданным началом
+PREFIX_END = '\U0010ffff'
+
+# (версия, группы, группы по slug, группы по id)
+_local = (None, (), {}, {})
+
+
+def get_cache():
+    return caches[settings.POSTS_GROUP_CACHE_ALIAS]
+
+
+def invalidate():
+    """Сброс списка групп во всех процессах"""
+    get_cache().delete_many((VERSION_KEY, LIST_KEY))
+
+
+def invalidate_on_commit():
+    """Сброс сразу и повторно после фиксации транзакции: иначе другой
+    запрос успеет закэшировать ещё не изменённые данные"""
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def load():
+    """Список групп из общего кэша или из БД: (версия, группы)"""
+    cache = get_cache()
+    found = cache.get_many((VERSION_KEY, LIST_KEY))
+    version = found.get(VERSION_KEY)
+    if version is not None and found.get(LIST_KEY, {}).get(
+        'version'
+    ) == version:
+        return version, found[LIST_KEY]['groups']
+    if version is None:
+        version = uuid.uuid4().hex
+        # add не затирает версию, выставленную другим процессом
+        if not cache.add(
+            VERSION_KEY, version, settings.POSTS_GROUP_CACHE_TIMEOUT
+        ):
+            version = cache.get(VERSION_KEY, version)
+    groups = tuple(
+        Group.objects.using('default').defer('posts_count').order_by(
+            'title', 'pk'
+        )
+    )
+    cache.set(
+        LIST_KEY, {'version': version, 'groups': groups},
+        settings.POSTS_GROUP_CACHE_TIMEOUT
+    )
+    return version, groups
+
+
+def current():
+    global _local
+    version = get_cache().get(VERSION_KEY)
+    if version is None or version != _local[0]:
+        version, groups = load()
+        _local = (
+            version,
+            groups,
+            {group.slug: group for group in groups},
+            {group.pk: group for group in groups},
+        )
+    return _local
+
+
+def all_groups():
+    """Все группы в порядке названий"""
+    return current()[1]
+
+
+def get_by_slug(slug):
+    return current()[2].get(slug)
+
+
+def get_by_pk(pk):
+    return current()[3].get(pk)
+
+
+def posts_count(group):
+    """Число постов группы: из кэша, при промахе - из строки группы в
+    основной БД"""
+    cache = get_cache()
+    key = COUNT_KEY.format(group.pk)
+    count = cache.get(key)
+    if count is None:
+        try:
+            count = Group.objects.using('default').values_list(
+                'posts_count', flat=True
+            ).get(pk=group.pk)
+        except Group.DoesNotExist:
+            return 0
+        cache.set(key, count, settings.POSTS_GROUP_CACHE_TIMEOUT)
+    return count
+
+
+def forget_posts_counts(group_ids):
+    """Сброс счётчиков постов групп сразу и после фиксации транзакции,
+    как в invalidate_on_commit"""
+    keys = [COUNT_KEY.format(pk) for pk in group_ids]
+    get_cache().delete_many(keys)
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def get_group_or_404(slug):
+    group = get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def prefix(field, value):
+    """Условие «field начинается с value» диапазоном: в отличие от
+    LIKE, такое условие использует обычный индекс на любой БД"""
+    return Q(**{f'{field}__gte': value, f'{field}__lt': value + PREFIX_END})
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """Группы, у которых название или slug начинаются с query.
+
+    Ищет в БД по индексам group_title_idx и уникальному индексу slug,
+    не загружая список групп. Название сравнивается с учётом регистра,
+    поэтому проверяется и вариант с заглавной первой буквой.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    condition = prefix('slug', query.lower())
+    for title in {query, query[:1].upper() + query[1:]}:
+        condition |= prefix('title', title)
+    return list(
+        Group.objects.filter(condition).order_by('title', 'pk').values(
+            'id', 'title', 'slug'
+        )[:limit]
+    )
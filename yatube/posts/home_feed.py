@@ -0,0 +1,247 @@
+"""Материализованное начало главной ленты.
+
+Таблица HomeFeedEntry хранит POSTS_HOME_FEED_SIZE новейших постов в
+порядке ленты вместе с данными карточки: именем автора, slug и названием
+группы. Первая страница главной читается из неё одним запросом по индексу.
+Общее число постов для паджинатора хранится рядом, в кэше
+POSTS_HOME_FEED_CACHE_ALIAS (posts_count), поэтому первой странице
+не нужен COUNT(*) по таблице постов.
+
+Таблицу поддерживают сигналы posts.signals; включается настройкой
+POSTS_HOME_FEED, после включения её нужно заполнить командой
+rebuild_home_feed, а check_home_feed сверяет её с таблицей Post.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+
+from . import groups
+from .models import Group, HomeFeedEntry, Post, User
+from .paginators import CountedPaginator
+
+COUNT_KEY = 'posts:home_feed:count'
+# Изменения в обход сигналов (update, bulk_create) счётчик увидит не
+# позже, чем через час
+COUNT_TIMEOUT = 60 * 60
+
+# Поля записи, которые сверяются с постом
+COMPARED_FIELDS = (
+    'text', 'pub_date', 'updated', 'author_id', 'author_username',
+    'author_first_name', 'author_last_name', 'group_id', 'group_slug',
+    'group_title',
+)
+
+
+def is_enabled():
+    return settings.POSTS_HOME_FEED
+
+
+def feed_size():
+    return settings.POSTS_HOME_FEED_SIZE
+
+
+def serves(queryset):
+    """Совпадает ли начало queryset с материализованной лентой:
+    все посты без фильтров в порядке по умолчанию"""
+    return (
+        is_enabled()
+        and queryset.model is Post
+        and not queryset.query.where
+        and not queryset.query.order_by
+    )
+
+
+def posts_count():
+    """Число всех постов из кэша, при промахе - из основной БД"""
+    cache = caches[settings.POSTS_HOME_FEED_CACHE_ALIAS]
+    count = cache.get(COUNT_KEY)
+    if count is None:
+        count = Post.objects.using('default').count()
+        cache.set(COUNT_KEY, count, COUNT_TIMEOUT)
+    return count
+
+
+def forget_posts_count():
+    """Сброс числа постов сразу и после фиксации транзакции"""
+    def forget():
+        caches[settings.POSTS_HOME_FEED_CACHE_ALIAS].delete(COUNT_KEY)
+    forget()
+    transaction.on_commit(forget)
+
+
+def entry_for(post):
+    """Запись ленты по посту с загруженным автором; группа - из кэша
+    групп"""
+    group = groups.get_by_pk(post.group_id)
+    return HomeFeedEntry(
+        post_id=post.pk,
+        text=post.text,
+        pub_date=post.pub_date,
+        updated=post.updated,
+        author_id=post.author_id,
+        author_username=post.author.username,
+        author_first_name=post.author.first_name,
+        author_last_name=post.author.last_name,
+        group_id=post.group_id,
+        group_slug=group.slug if group else '',
+        group_title=group.title if group else '',
+    )
+
+
+def post_for(entry):
+    """Пост для карточки, собранный из записи без обращения к БД"""
+    author = User(
+        id=entry.author_id,
+        username=entry.author_username,
+        first_name=entry.author_first_name,
+        last_name=entry.author_last_name,
+    )
+    group = None
+    if entry.group_id is not None:
+        group = Group(
+            id=entry.group_id, slug=entry.group_slug, title=entry.group_title
+        )
+    return Post(
+        id=entry.post_id,
+        text=entry.text,
+        pub_date=entry.pub_date,
+        updated=entry.updated,
+        author=author,
+        group=group,
+    )
+
+
+def first_posts(limit):
+    """Первые limit постов главной из материализованной ленты"""
+    return [
+        post_for(entry) for entry in HomeFeedEntry.objects.all()[:limit]
+    ]
+
+
+def feed_posts(limit, after=None):
+    """Посты для заполнения ленты: новейшие или старше записи after"""
+    posts = Post.objects.for_feed()
+    if after is not None:
+        posts = posts.filter(
+            Q(pub_date__lt=after.pub_date)
+            | Q(pub_date=after.pub_date, pk__lt=after.post_id)
+        )
+    return posts[:limit]
+
+
+def store_post(post, created):
+    """Учёт нового или изменённого поста"""
+    if created:
+        # Новый пост - самый свежий: он попадает в начало ленты
+        entry_for(post).save(force_insert=True)
+        trim()
+        return
+    entry = entry_for(post)
+    HomeFeedEntry.objects.filter(pk=post.pk).update(**{
+        field: getattr(entry, field) for field in COMPARED_FIELDS
+    })
+
+
+def trim():
+    """Удаление записей сверх размера ленты"""
+    extra = list(
+        HomeFeedEntry.objects.values_list('pk', flat=True)[feed_size():]
+    )
+    if extra:
+        HomeFeedEntry.objects.filter(pk__in=extra).delete()
+
+
+def top_up():
+    """Дополнение ленты после удаления постов следующими по порядку"""
+    missing = feed_size() - HomeFeedEntry.objects.count()
+    if missing <= 0:
+        return
+    last = HomeFeedEntry.objects.order_by('pub_date', 'post').first()
+    HomeFeedEntry.objects.bulk_create(
+        entry_for(post) for post in feed_posts(missing, after=last)
+    )
+
+
+def update_author(user):
+    HomeFeedEntry.objects.filter(author=user).update(
+        author_username=user.username,
+        author_first_name=user.first_name,
+        author_last_name=user.last_name,
+    )
+
+
+def update_group(group):
+    HomeFeedEntry.objects.filter(group=group).update(
+        group_slug=group.slug, group_title=group.title
+    )
+
+
+def clear_group(slug):
+    """Удаление данных группы после её удаления (ссылку обнулил SET_NULL)"""
+    HomeFeedEntry.objects.filter(group=None, group_slug=slug).update(
+        group_slug='', group_title=''
+    )
+
+
+def rebuild():
+    """Заполнение ленты заново по таблице Post"""
+    with transaction.atomic():
+        HomeFeedEntry.objects.all().delete()
+        entries = HomeFeedEntry.objects.bulk_create(
+            entry_for(post) for post in feed_posts(feed_size())
+        )
+    forget_posts_count()
+    return len(entries)
+
+
+def diff():
+    """Расхождения ленты с Post.objects.all(): список строк-описаний"""
+    expected = [entry_for(post) for post in feed_posts(feed_size())]
+    actual = list(HomeFeedEntry.objects.all())
+    problems = []
+    expected_ids = [entry.post_id for entry in expected]
+    actual_ids = [entry.post_id for entry in actual]
+    for post_id in sorted(set(expected_ids) - set(actual_ids)):
+        problems.append(f'пост {post_id} отсутствует в ленте')
+    for post_id in sorted(set(actual_ids) - set(expected_ids)):
+        problems.append(f'пост {post_id} лишний в ленте')
+    if not problems and expected_ids != actual_ids:
+        problems.append('порядок записей не совпадает с порядком постов')
+    actual_by_id = {entry.post_id: entry for entry in actual}
+    for entry in expected:
+        stored = actual_by_id.get(entry.post_id)
+        if stored is None:
+            continue
+        for field in COMPARED_FIELDS:
+            if getattr(stored, field) != getattr(entry, field):
+                problems.append(
+                    f'пост {entry.post_id}: поле {field} устарело'
+                )
+    return problems
+
+
+class HomeFeedPaginator(CountedPaginator):
+    """Первая страница - из материализованной ленты, остальные - из Post.
+
+    load_first_page() загружает посты первой страницы; по умолчанию -
+    first_posts(per_page).
+    """
+
+    def __init__(self, object_list, per_page, count, load_first_page=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, count, **kwargs)
+        self.load_first_page = load_first_page or partial(
+            first_posts, per_page
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if number == 1:
+            posts = self.load_first_page()
+            # Неполная лента (не заполнена после включения) - читаем Post
+            if len(posts) == min(self.per_page, self.count):
+                return self._get_page(posts, number, self)
+        return super().page(number)
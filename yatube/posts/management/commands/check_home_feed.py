@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.home_feed import diff
+
+
+class Command(BaseCommand):
+    help = 'Сверяет материализованную главную ленту с таблицей Post'
+
+    def handle(self, *args, **options):
+        problems = diff()
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError(
+                f'Найдено расхождений: {len(problems)}, '
+                'исправить - командой rebuild_home_feed'
+            )
+        self.stdout.write(self.style.SUCCESS('Главная лента согласована'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (
+    CHUNK_SIZE, FORMATS, export_queryset, iter_rows, render
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка постов в JSON Lines или CSV '
+        '(формат совместим с import_posts)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки; по умолчанию - стандартный вывод'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию - по расширению или jsonl'
+        )
+        parser.add_argument('--since', help='Начало периода (дата)')
+        parser.add_argument('--until', help='Конец периода (дата)')
+        parser.add_argument('--group', help='Slug группы')
+        parser.add_argument('--author', help='Username автора')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Постов, читаемых из БД за раз'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = path.rsplit('.', 1)[-1].lower()
+            file_format = extension if extension in FORMATS else 'jsonl'
+        try:
+            queryset = export_queryset(
+                options['since'], options['until'],
+                options['group'], options['author']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        lines = render(iter_rows(queryset, options['chunk_size']), file_format)
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            stream.writelines(lines)
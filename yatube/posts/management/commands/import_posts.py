@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import cache, home_feed
+from posts.bulk import preserve_dates
+from posts.export import FORMATS
+from posts.models import Group, Post
+from posts.search import rebuild_index
+
+from .rebuild_post_counters import rebuild_post_counters
+
+User = get_user_model()
+
+
+def read_rows(stream, file_format):
+    """Построчное чтение записей: файл целиком в память не загружается"""
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Некорректную строку пропустит build_post
+                yield None
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт постов из JSON Lines или CSV: поля text, author (username), '
+        'group (slug, необязательно), pub_date (ISO 8601, необязательно)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию - по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Постов в одном INSERT (bulk_create)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=20000,
+            help='Постов в одной транзакции'
+        )
+        parser.add_argument(
+            '--keep-dates', action='store_true',
+            help='Сохранять pub_date из файла вместо текущего времени'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию <path>.checkpoint'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванный импорт с контрольной точки'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат {file_format!r}, укажите --format'
+            )
+        self.checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        self.keep_dates = options['keep_dates']
+        self.batch_size = options['batch_size']
+        done = self.read_checkpoint() if options['resume'] else 0
+
+        # Справочники авторов и групп целиком в памяти: по запросу на
+        # строку импорт миллиона постов шёл бы часами
+        self.authors = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.touched_authors = set()
+        self.touched_groups = set()
+        self.skipped = 0
+
+        started = time.perf_counter()
+        imported = 0
+        with open(path, newline='', encoding='utf-8') as stream:
+            rows = islice(read_rows(stream, file_format), done, None)
+            if done:
+                self.stdout.write(f'Пропущено уже загруженных: {done}')
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                chunk_started = time.perf_counter()
+                created = self.import_chunk(chunk, line=done + 1)
+                done += len(chunk)
+                imported += created
+                self.write_checkpoint(done)
+                elapsed = time.perf_counter() - chunk_started
+                self.stdout.write(
+                    f'{done} строк обработано, '
+                    f'{created / elapsed:.0f} постов/с'
+                )
+
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self.finish()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {imported}, пропущено: {self.skipped}, '
+            f'{elapsed:.1f} с, {imported / max(elapsed, 1e-9):.0f} постов/с'
+        ))
+
+    def import_chunk(self, rows, line):
+        posts = []
+        for number, row in enumerate(rows, start=line):
+            post = self.build_post(row, number)
+            if post is not None:
+                posts.append(post)
+        with transaction.atomic():
+            if self.keep_dates:
+                with preserve_dates():
+                    Post.objects.bulk_create(posts, self.batch_size)
+            else:
+                Post.objects.bulk_create(posts, self.batch_size)
+        return len(posts)
+
+    def build_post(self, row, number):
+        """Пост из записи файла; None, если запись некорректна"""
+        if not isinstance(row, dict):
+            return self.skip(number, 'запись не разобрана как объект')
+        author = row.get('author')
+        group_slug = row.get('group') or None
+        text = row.get('text')
+        if not all(
+            value is None or isinstance(value, str)
+            for value in (author, group_slug, text)
+        ):
+            return self.skip(number, 'поля должны быть строками')
+        author_id = self.authors.get(author)
+        group_id = self.groups.get(group_slug)
+        if author_id is None or not text or (group_slug and not group_id):
+            return self.skip(
+                number, 'неизвестный автор/группа или пустой текст'
+            )
+        post = Post(text=text, author_id=author_id, group_id=group_id)
+        if self.keep_dates:
+            try:
+                pub_date = parse_datetime(row.get('pub_date') or '')
+            except (TypeError, ValueError):
+                return self.skip(number, 'некорректная дата публикации')
+            if pub_date is None:
+                pub_date = timezone.now()
+            elif timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            post.pub_date = post.updated = pub_date
+        self.touched_authors.add(author)
+        if group_slug:
+            self.touched_groups.add(group_slug)
+        return post
+
+    def skip(self, number, reason):
+        self.skipped += 1
+        self.stderr.write(f'Строка {number}: {reason}')
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as stream:
+                return json.load(stream)['rows']
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError):
+            raise CommandError(
+                f'Повреждена контрольная точка {self.checkpoint}'
+            )
+
+    def write_checkpoint(self, rows):
+        """Запись числа закоммиченных строк; замена файла атомарна"""
+        temp = f'{self.checkpoint}.tmp'
+        with open(temp, 'w') as stream:
+            json.dump({'rows': rows}, stream)
+        os.replace(temp, self.checkpoint)
+
+    def finish(self):
+        """bulk_create не шлёт сигналы: пересчитываем производные данные"""
+        self.stdout.write('Пересчёт производных данных...')
+        rebuild_post_counters()
+        rebuild_index()
+        if home_feed.is_enabled():
+            home_feed.rebuild()
+        cache.purge(
+            *cache.index_scope(),
+            *(scope for username in self.touched_authors
+              for scope in cache.profile_scope(username)),
+            *(scope for slug in self.touched_groups
+              for scope in cache.group_scope(slug)),
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.home_feed import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованную главную ленту по таблице Post'
+
+    def handle(self, *args, **options):
+        entries = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в главной ленте: {entries}'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts import groups as group_cache
+from posts.models import AuthorStats, Group, Post
+
+
+def rebuild_post_counters():
+    """Пересчёт счётчиков постов авторов и групп по таблице Post"""
+    group_counts = Post.objects.filter(group=OuterRef('pk')).order_by(
+    ).values('group').annotate(total=Count('pk')).values('total')
+    with transaction.atomic():
+        groups = Group.objects.update(posts_count=Coalesce(
+            Subquery(group_counts, output_field=IntegerField()), 0
+        ))
+        AuthorStats.objects.all().delete()
+        authors = AuthorStats.objects.bulk_create(
+            AuthorStats(author_id=row['author'], posts_count=row['total'])
+            for row in Post.objects.order_by().values('author').annotate(
+                total=Count('pk')
+            )
+        )
+    group_cache.forget_posts_counts(
+        Group.objects.values_list('pk', flat=True)
+    )
+    return groups, len(authors)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает хранимые счётчики постов авторов и групп'
+
+    def handle(self, *args, **options):
+        groups, authors = rebuild_post_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано групп: {groups}, авторов: {authors}'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        backend = 'FTS5' if fts_available() else 'PostSearchToken'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed} ({backend})'
+        ))
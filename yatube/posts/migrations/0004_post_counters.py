@@ -0,0 +1,52 @@
+# Generated by Django 2.2.19 on 2026-10-18 18:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    for row in Post.objects.order_by().values('group').annotate(
+        total=models.Count('pk')
+    ):
+        if row['group'] is not None:
+            Group.objects.filter(pk=row['group']).update(
+                posts_count=row['total']
+            )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], posts_count=row['total'])
+        for row in Post.objects.order_by().values('author').annotate(
+            total=models.Count('pk')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
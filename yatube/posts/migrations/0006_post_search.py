@@ -0,0 +1,83 @@
+# Generated by Django 2.2.19 on 2026-10-18 18:32
+
+import collections
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    if 'ENABLE_FTS5' in options:
+        return True
+    # FTS5 может быть подключён и без флага компиляции - проверяем делом
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.fts5_probe')
+    except Exception:
+        return False
+    return True
+
+
+def create_fts_index(apps, schema_editor):
+    """Индекс FTS5 там, где он доступен, иначе заполняем PostSearchToken"""
+    connection = schema_editor.connection
+    Post = apps.get_model('posts', 'Post')
+    if fts5_supported(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(text)'
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+        return
+    PostSearchToken = apps.get_model('posts', 'PostSearchToken')
+    for post in Post.objects.only('text').iterator():
+        words = collections.Counter(
+            word[:100] for word in re.findall(r'\w+', post.text.lower())
+        )
+        PostSearchToken.objects.bulk_create(
+            PostSearchToken(post_id=post.pk, token=token, weight=weight)
+            for token, weight in words.items()
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поиска',
+                'verbose_name_plural': 'Слова поиска',
+                'unique_together': {('token', 'post')},
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
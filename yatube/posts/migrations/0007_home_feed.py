@@ -0,0 +1,41 @@
+# Generated by Django 2.2.19 on 2026-10-18 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeFeedEntry',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='home_entry', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('text', models.TextField(verbose_name='Текст поста')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('updated', models.DateTimeField(verbose_name='Дата изменения')),
+                ('author_username', models.CharField(max_length=150, verbose_name='Имя пользователя')),
+                ('author_first_name', models.CharField(blank=True, max_length=150, verbose_name='Имя')),
+                ('author_last_name', models.CharField(blank=True, max_length=150, verbose_name='Фамилия')),
+                ('group_slug', models.SlugField(blank=True, verbose_name='Ссылка на группу')),
+                ('group_title', models.CharField(blank=True, max_length=200, verbose_name='Название группы')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Запись главной ленты',
+                'verbose_name_plural': 'Записи главной ленты',
+                'ordering': ['-pub_date', '-post'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='homefeedentry',
+            index=models.Index(fields=['-pub_date', '-post'], name='home_feed_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_home_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['title'], name='group_title_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='description',
+            field=models.TextField(verbose_name='Описание группы'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='Ссылка на группу'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='title',
+            field=models.CharField(max_length=200, verbose_name='Название группы'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posts', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='group',
+            field=models.ForeignKey(blank=True, help_text='Группа, к которой будет относиться пост', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='posts.Group', verbose_name='Группа'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=models.TextField(help_text='Введите текст поста', verbose_name='Текст поста'),
+        ),
+    ]
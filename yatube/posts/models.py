@@ -4,23 +4,61 @@ from django.db import models
 User = get_user_model()
 
 SYMBOLS_AMOUNT = 15
+TOKEN_LENGTH = 100
 
 
 class Group(models.Model):
     title = models.CharField('Название группы', max_length=200)
     slug = models.SlugField('Ссылка на группу', unique=True)
     description = models.TextField('Описание группы')
+    # Счётчик ведут сигналы posts.signals, пересчёт - rebuild_post_counters
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        # Поиск группы по началу названия (posts.groups.search)
+        indexes = [
+            models.Index(fields=['title'], name='group_title_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Посты для лент: автор подтягивается одним JOIN, группу
+        карточка берёт из кэша групп (posts.groups) по group_id;
+        ненужные в карточке столбцы не загружаются"""
+        return self.select_related('author').only(
+            'text',
+            'pub_date',
+            'updated',
+            'group',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    # Меняется при каждом сохранении: версия поста для кэша карточек
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    # Номер правки для оптимистической блокировки в post_edit
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -37,9 +75,123 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-pub_date']
+        # id разрешает совпадения pub_date: порядок ленты однозначен
+        # и совпадает с порядком курсорной пагинации
+        ordering = ['-pub_date', '-id']
+        # Индексы под каждую ленту: БД читает посты уже в нужном
+        # порядке и не сортирует выборку целиком
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         # Выводим текст поста
         return self.text[:SYMBOLS_AMOUNT]
+
+
+class PostSearchToken(models.Model):
+    """Слово поста для поиска на БД без FTS5 (см. posts.search)"""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='Пост'
+    )
+    token = models.CharField('Слово', max_length=TOKEN_LENGTH)
+    weight = models.PositiveIntegerField('Число вхождений', default=1)
+
+    class Meta:
+        # Составной уникальный индекс (token, post) - индекс поиска
+        unique_together = ('token', 'post')
+        verbose_name = 'Слово поиска'
+        verbose_name_plural = 'Слова поиска'
+
+    def __str__(self) -> str:
+        return self.token
+
+
+class AuthorStats(models.Model):
+    """Хранимая статистика автора, чтобы не считать его посты COUNT(*)"""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+
+class HomeFeedEntry(models.Model):
+    """Пост из начала главной ленты с данными карточки (см. posts.home_feed)
+
+    Автор и группа продублированы, чтобы первая страница главной
+    читалась одним запросом по индексу без JOIN и сортировки Post.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='home_entry',
+        verbose_name='Пост'
+    )
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    updated = models.DateTimeField('Дата изменения')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    author_username = models.CharField('Имя пользователя', max_length=150)
+    author_first_name = models.CharField('Имя', max_length=150, blank=True)
+    author_last_name = models.CharField('Фамилия', max_length=150, blank=True)
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Группа'
+    )
+    group_slug = models.SlugField('Ссылка на группу', blank=True)
+    group_title = models.CharField(
+        'Название группы', max_length=200, blank=True
+    )
+
+    class Meta:
+        # Тот же порядок, что и у Post
+        ordering = ['-pub_date', '-post']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-post'],
+                name='home_feed_pub_date_idx'
+            ),
+        ]
+        verbose_name = 'Запись главной ленты'
+        verbose_name_plural = 'Записи главной ленты'
+
+    def __str__(self) -> str:
+        return self.text[:SYMBOLS_AMOUNT]
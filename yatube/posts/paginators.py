@@ -0,0 +1,156 @@
+import base64
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Порядок ленты в курсорном режиме: последнее поле - уникальный id,
+# поэтому позиция в ленте однозначно задаётся парой (pub_date, id)
+CURSOR_ORDERING = ('-pub_date', '-id')
+
+FORWARD = 'n'
+BACKWARD = 'p'
+# Допустимые id: больше не помещается в знаковое 64-битное поле БД
+MAX_PK = 2 ** 63 - 1
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому общее число объектов передано заранее.
+
+    Позволяет взять хранимый счётчик постов вместо COUNT(*) по выборке.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        # count у Paginator - cached_property, подставляем готовое значение
+        self.__dict__['count'] = count
+
+
+class InvalidCursor(Exception):
+    """Токен курсора повреждён или подделан."""
+
+
+def encode_cursor(post, direction):
+    """Упаковка позиции поста в непрозрачный токен для ?cursor="""
+    payload = json.dumps(
+        [post.pub_date.isoformat(), post.pk, direction],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковка токена в (pub_date, id, направление)"""
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding)
+        pub_date, pk, direction = json.loads(raw.decode())
+        pub_date = parse_datetime(pub_date)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if (
+        pub_date is None
+        or type(pk) is not int
+        or not -MAX_PK - 1 <= pk <= MAX_PK
+        or direction not in (FORWARD, BACKWARD)
+    ):
+        raise InvalidCursor(token)
+    return pub_date, pk, direction
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен
+    шаблонам, но вместо номеров страниц отдаёт токены соседних страниц.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s posts>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) без OFFSET и COUNT(*).
+
+    Каждая страница - один запрос вида
+    WHERE (pub_date, id) < (курсор) ORDER BY pub_date DESC, id DESC LIMIT n+1,
+    стоимость которого не зависит от глубины страницы.
+    """
+    cursor_mode = True
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by(*CURSOR_ORDERING)
+        self.per_page = per_page
+
+    def get_page(self, token):
+        """Страница по токену; битый токен ведёт на первую страницу"""
+        if token:
+            try:
+                return self.page(*decode_cursor(token))
+            except InvalidCursor:
+                pass
+        return self.first_page()
+
+    def first_page(self):
+        rows = list(self.queryset[:self.per_page + 1])
+        return self._build(rows, has_more=False, direction=FORWARD)
+
+    def page(self, pub_date, pk, direction):
+        if direction == FORWARD:
+            # Избыточное условие pub_date <= курсора позволяет БД
+            # начать просмотр индекса сразу с нужной позиции
+            queryset = self.queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(id__lt=pk)
+            )
+            rows = list(queryset[:self.per_page + 1])
+        else:
+            queryset = self.queryset.filter(pub_date__gte=pub_date).filter(
+                Q(pub_date__gt=pub_date) | Q(id__gt=pk)
+            ).reverse()
+            rows = list(queryset[:self.per_page + 1])
+            rows.reverse()
+        return self._build(rows, has_more=True, direction=direction)
+
+    def _build(self, rows, has_more, direction):
+        """Обрезка лишней строки и расчёт токенов соседних страниц.
+
+        has_more означает, что по другую сторону от курсора записи есть
+        заведомо: мы пришли на эту страницу оттуда.
+        """
+        overflow = len(rows) > self.per_page
+        if direction == FORWARD:
+            rows = rows[:self.per_page]
+            has_next, has_previous = overflow, has_more
+        else:
+            rows = rows[-self.per_page:] if overflow else rows
+            has_next, has_previous = has_more, overflow
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(rows[-1], FORWARD)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(rows[0], BACKWARD)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
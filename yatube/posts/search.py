@@ -0,0 +1,128 @@
+"""Полнотекстовый поиск по Post.text через инвертированный индекс.
+
+На SQLite с модулем FTS5 индекс - виртуальная таблица posts_post_fts
+(rowid = id поста), ранжирование - встроенный bm25. На остальных БД
+используется таблица PostSearchToken: слово -> пост с числом вхождений.
+Индекс обновляется сигналами при создании, правке и удалении поста.
+"""
+import re
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import TOKEN_LENGTH, Post, PostSearchToken
+
+FTS_TABLE = 'posts_post_fts'
+# Постов на запрос и строк на вставку при перестроении индекса
+REBUILD_CHUNK_SIZE = 2000
+
+_fts_tables = {}
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре (буквы любого алфавита и цифры)"""
+    words = re.findall(r'\w+', text.lower())
+    return [word[:TOKEN_LENGTH] for word in words]
+
+
+def fts_available():
+    """Есть ли в текущей БД таблица FTS5 (её создаёт миграция)"""
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[key]
+
+
+def index_post(post):
+    """Добавление или обновление поста в индексе"""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+        return
+    with transaction.atomic():
+        PostSearchToken.objects.filter(post_id=post.pk).delete()
+        PostSearchToken.objects.bulk_create(search_tokens(post))
+
+
+def search_tokens(post):
+    """Строки PostSearchToken поста"""
+    return [
+        PostSearchToken(post_id=post.pk, token=token, weight=weight)
+        for token, weight in Counter(tokenize(post.text)).items()
+    ]
+
+
+def unindex_post(post_id):
+    """Удаление поста из индекса"""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    # Строки PostSearchToken удалит каскад вместе с постом
+
+
+def rebuild_index():
+    """Полное перестроение индекса по таблице Post"""
+    with transaction.atomic():
+        if fts_available():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                    f'SELECT id, text FROM {Post._meta.db_table}'
+                )
+            return Post.objects.count()
+        PostSearchToken.objects.all().delete()
+        indexed = 0
+        batch = []
+        for post in Post.objects.only('text').iterator(
+            chunk_size=REBUILD_CHUNK_SIZE
+        ):
+            batch += search_tokens(post)
+            indexed += 1
+            if len(batch) >= REBUILD_CHUNK_SIZE:
+                PostSearchToken.objects.bulk_create(
+                    batch, batch_size=REBUILD_CHUNK_SIZE
+                )
+                batch = []
+        PostSearchToken.objects.bulk_create(
+            batch, batch_size=REBUILD_CHUNK_SIZE
+        )
+        return indexed
+
+
+def search_posts(query, queryset=None):
+    """Посты, содержащие все слова запроса, от самых релевантных"""
+    if queryset is None:
+        queryset = Post.objects.all()
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+    if fts_available():
+        # Каждое слово в кавычках: операторы FTS5 из запроса не работают
+        match = ' '.join(f'"{token}"' for token in tokens)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+            order_by=[f'{FTS_TABLE}.rank'],
+        )
+    tokens = set(tokens)
+    return queryset.filter(search_tokens__token__in=tokens).annotate(
+        matched=Count('search_tokens'),
+        score=Sum('search_tokens__weight'),
+    ).filter(matched=len(tokens)).order_by('-score', '-pub_date', '-id')
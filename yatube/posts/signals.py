@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import cache, groups, home_feed, search
+from .models import AuthorStats, Group, Post, User
+
+# Поля пользователя, которые выводятся в карточках и на страницах постов
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def change_author_count(author_id, delta):
+    """Изменение счётчика постов автора на delta"""
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(posts_count__gte=-delta)
+    if not stats.update(posts_count=F('posts_count') + delta) and delta > 0:
+        # Строки ещё нет (первый пост автора или старые данные):
+        # создаём её сразу с точным значением
+        AuthorStats.objects.get_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=author_id).count()
+            }
+        )
+
+
+def change_group_count(group_id, delta):
+    """Изменение счётчика постов группы на delta"""
+    if group_id is None:
+        return
+    queryset = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        queryset = queryset.filter(posts_count__gte=-delta)
+    queryset.update(posts_count=F('posts_count') + delta)
+    groups.forget_posts_counts([group_id])
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Запоминаем исходную группу, чтобы заметить её смену при сохранении.
+
+    Читаем __dict__, чтобы не догружать отложенное поле отдельным запросом.
+    """
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+def count_saved_post(post, created, previous_group_id):
+    if created:
+        change_author_count(post.author_id, 1)
+        change_group_count(post.group_id, 1)
+    elif previous_group_id != post.group_id:
+        change_group_count(previous_group_id, -1)
+        change_group_count(post.group_id, 1)
+
+
+def purge_post_pages(post, *group_ids):
+    """Сброс кэша лент, в которых показан пост, и его страницы"""
+    if not settings.POSTS_PAGE_CACHE:
+        return
+    scopes = list(cache.index_scope()) + list(cache.post_scope(post.pk))
+    scopes += cache.profile_scope(post.author.username)
+    for group_id in group_ids:
+        group = group_id and groups.get_by_pk(group_id)
+        if group:
+            scopes += cache.group_scope(group.slug)
+    cache.purge(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    previous_group_id = instance._initial_group_id
+    instance._initial_group_id = instance.group_id
+    count_saved_post(instance, created, previous_group_id)
+    purge_post_pages(instance, instance.group_id, previous_group_id)
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+    if home_feed.is_enabled():
+        home_feed.store_post(instance, created)
+        if created:
+            home_feed.forget_posts_count()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_count(instance.author_id, -1)
+    change_group_count(instance.group_id, -1)
+    purge_post_pages(instance, instance.group_id)
+    search.unindex_post(instance.pk)
+    if home_feed.is_enabled():
+        # Запись ленты удалил каскад, освободившееся место занимает
+        # следующий по порядку пост
+        home_feed.top_up()
+        home_feed.forget_posts_count()
+
+
+def name_of(user):
+    """Имя пользователя, которое выводится на страницах его постов;
+    отложенные поля не загружаются"""
+    return tuple(user.__dict__.get(field) for field in NAME_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_name(sender, instance, **kwargs):
+    """Запоминаем имя, чтобы заметить его смену при сохранении"""
+    instance._initial_name = name_of(instance)
+
+
+def purge_author_pages(user, initial_username):
+    """Сброс кэша страниц с именем автора: общей ленты, профиля (от него
+    зависят и страницы постов автора) и групп с его постами"""
+    scopes = list(cache.index_scope()) + list(cache.profile_scope(
+        user.username
+    ))
+    if initial_username and initial_username != user.username:
+        scopes += cache.profile_scope(initial_username)
+    for group_id in Post.objects.filter(author=user).exclude(
+        group=None
+    ).order_by().values_list('group_id', flat=True).distinct():
+        group = groups.get_by_pk(group_id)
+        if group:
+            scopes += cache.group_scope(group.slug)
+    cache.purge(*scopes)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    initial_name = instance._initial_name
+    instance._initial_name = name_of(instance)
+    if raw or created:
+        return
+    # Вход пользователя сохраняет только last_login - лента не меняется
+    if update_fields is not None and not set(update_fields) & set(
+        NAME_FIELDS
+    ):
+        return
+    if initial_name == instance._initial_name:
+        return
+    if home_feed.is_enabled():
+        home_feed.update_author(instance)
+    if settings.POSTS_PAGE_CACHE:
+        purge_author_pages(instance, initial_name[0])
+
+
+@receiver(post_init, sender=Group)
+def remember_link(sender, instance, **kwargs):
+    """Запоминаем slug и название: они выводятся в карточках лент"""
+    instance._initial_link = (
+        instance.__dict__.get('slug'), instance.__dict__.get('title')
+    )
+
+
+@receiver(post_save, sender=Group)
+def purge_saved_group(sender, instance, created, **kwargs):
+    initial_slug, initial_title = instance._initial_link
+    instance._initial_link = (instance.slug, instance.title)
+    groups.invalidate_on_commit()
+    if home_feed.is_enabled():
+        home_feed.update_group(instance)
+    if not settings.POSTS_PAGE_CACHE:
+        return
+    scopes = list(cache.group_scope(instance.slug))
+    if initial_slug and initial_slug != instance.slug:
+        scopes += cache.group_scope(initial_slug)
+    if not created and (initial_slug, initial_title) != (
+        instance.slug, instance.title
+    ):
+        # Ссылки на группу есть в общей ленте и в профилях её авторов
+        scopes += cache.index_scope()
+        for username in User.objects.filter(
+            posts__group=instance
+        ).values_list('username', flat=True).distinct():
+            scopes += cache.profile_scope(username)
+    cache.purge(*scopes)
+
+
+@receiver(post_delete, sender=Group)
+def purge_deleted_group(sender, instance, **kwargs):
+    groups.invalidate_on_commit()
+    if home_feed.is_enabled():
+        home_feed.clear_group(instance.slug)
+    if settings.POSTS_PAGE_CACHE:
+        # Посты группы остались в общей ленте, но уже без ссылки на неё
+        cache.purge(*cache.group_scope(instance.slug), *cache.index_scope())
@@ -0,0 +1,13 @@
+from django import template
+
+from posts import groups
+
+register = template.Library()
+
+
+@register.filter
+def cached_group(group_id):
+    """Группа поста по group_id из кэша групп, без запроса к БД"""
+    if group_id is None:
+        return None
+    return groups.get_by_pk(group_id)
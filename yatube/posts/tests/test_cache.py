@@ -0,0 +1,488 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import cache as page_cache, views
+from ..models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(POSTS_PAGE_CACHE=True)
+class FeedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+        cls.other_user = User.objects.create_user(username='other_user')
+        Post.objects.create(
+            author=cls.other_user, text='Чужой пост', group=cls.other_group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.index_url = reverse('posts:homepage')
+        self.group_url = reverse(
+            'posts:group_posts', kwargs={'slug': self.group.slug}
+        )
+        self.other_group_url = reverse(
+            'posts:group_posts', kwargs={'slug': self.other_group.slug}
+        )
+        self.profile_url = reverse(
+            'posts:profile', kwargs={'username': self.user.username}
+        )
+        self.other_profile_url = reverse(
+            'posts:profile', kwargs={'username': self.other_user.username}
+        )
+        self.feed_urls = (
+            self.index_url,
+            self.group_url,
+            self.other_group_url,
+            self.profile_url,
+            self.other_profile_url,
+        )
+
+    def warm(self):
+        for url in self.feed_urls:
+            self.client.get(url)
+
+    def is_cached(self, url):
+        '''Страница отдана из кэша - без единого запроса к БД'''
+        try:
+            with self.assertNumQueries(0):
+                self.client.get(url)
+        except AssertionError:
+            return False
+        return True
+
+    def test_repeated_request_served_from_cache(self):
+        '''Повторный запрос ленты не обращается к БД'''
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_page_number_and_viewer_are_part_of_key(self):
+        '''Разные страницы и разные пользователи не делят записи кэша'''
+        self.client.get(self.index_url)
+        self.assertFalse(self.is_cached(self.index_url + '?page=2'))
+        response = self.author_client.get(self.index_url)
+        self.assertContains(response, self.user.username)
+        self.assertNotContains(self.client.get(self.index_url), 'Выйти')
+
+    def test_create_purges_only_affected_pages(self):
+        '''Новый пост сбрасывает главную, свою группу и профиль автора'''
+        self.warm()
+        self.author_client.post(reverse('posts:post_create'), {
+            'text': 'Новый пост', 'group': self.group.pk
+        })
+        for url in (self.index_url, self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый пост')
+        for url in (self.other_group_url, self.other_profile_url):
+            with self.subTest(url=url):
+                self.assertTrue(self.is_cached(url))
+
+    def test_edit_purges_old_and_new_group(self):
+        '''Перенос поста в другую группу сбрасывает обе группы'''
+        self.warm()
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Изменённый пост', 'group': self.other_group.pk}
+        )
+        self.assertNotContains(self.client.get(self.group_url), 'Изменённый')
+        self.assertContains(
+            self.client.get(self.other_group_url), 'Изменённый пост'
+        )
+        self.assertTrue(self.is_cached(self.other_profile_url))
+
+    def test_delete_purges_pages(self):
+        '''Удаление поста сбрасывает ленты, где он был'''
+        self.warm()
+        Post.objects.filter(pk=self.post.pk).delete()
+        for url in (self.index_url, self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), 'Тестовый пост')
+
+    def test_group_edit_purges_group_page(self):
+        '''Изменение группы сбрасывает её страницу'''
+        self.warm()
+        group = Group.objects.get(pk=self.group.pk)
+        group.description = 'Новое описание'
+        group.save()
+        self.assertContains(self.client.get(self.group_url), 'Новое описание')
+        self.assertTrue(self.is_cached(self.other_group_url))
+
+    def test_group_rename_purges_feeds_with_links(self):
+        '''Смена slug группы сбрасывает главную и профили её авторов'''
+        self.warm()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed_group'
+        group.save()
+        for url in (self.index_url, self.profile_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '/group/renamed_group/')
+                self.assertNotContains(response, '/group/test_group/')
+        self.assertTrue(self.is_cached(self.other_profile_url))
+
+    def test_author_rename_purges_pages(self):
+        '''Новое имя автора сразу видно на всех страницах с его постами'''
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.warm()
+        self.client.get(post_url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое'
+        user.last_name = 'Имя'
+        user.save()
+        for url in (
+            self.index_url, self.group_url, self.profile_url, post_url
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новое Имя')
+        self.assertTrue(self.is_cached(self.other_group_url))
+
+    def test_login_keeps_pages(self):
+        '''Вход пользователя (last_login) не сбрасывает кэш'''
+        self.warm()
+        Client().force_login(self.user)
+        self.assertTrue(self.is_cached(self.profile_url))
+
+    def test_post_detail_change_during_render(self):
+        '''Изменение автора во время рендера страницы поста: версии его
+        области прочитаны до рендера, и запись сразу устаревает'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        post_context = views.post_context
+
+        def changed_during_render(request, post_id):
+            context = post_context(request, post_id)
+            AuthorStats.objects.filter(author=self.user).update(
+                posts_count=5
+            )
+            page_cache.purge(*page_cache.profile_scope(self.user.username))
+            return context
+
+        with mock.patch.object(
+            views, 'post_context', changed_during_render
+        ):
+            self.assertContains(
+                self.client.get(url), 'Всего постов автора: 1'
+            )
+        self.assertContains(self.client.get(url), 'Всего постов автора: 5')
+
+    @override_settings(POSTS_PAGE_CACHE=False)
+    def test_disabled_cache_renders_every_time(self):
+        '''Без POSTS_PAGE_CACHE страницы не кэшируются'''
+        self.client.get(self.index_url)
+        self.assertFalse(self.is_cached(self.index_url))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    }
+})
+class FileBasedFeedPageCacheTests(FeedPageCacheTests):
+    '''Те же проверки на файловом бэкенде кэша'''
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+
+class PostCardFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_card_rendered_from_cache(self):
+        '''Неизменённый пост выводится из кэша карточек'''
+        self.client.get(reverse('posts:homepage'))
+        # update() не трогает updated - версия карточки прежняя
+        Post.objects.filter(pk=self.post.pk).update(text='Другой текст')
+        response = self.client.get(reverse('posts:homepage'))
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_post_edit_bumps_card_version(self):
+        '''Правка через post_edit обновляет карточку во всех лентах'''
+        urls = (
+            reverse('posts:homepage'),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            self.client.get(url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Изменённый пост'}
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Изменённый пост')
+                self.assertNotContains(response, 'Тестовый пост')
+
+    def test_author_and_group_edit_refresh_card(self):
+        '''Карточка перерисовывается после правки профиля автора и
+        slug группы'''
+        group = Group.objects.create(title='Группа', slug='old_slug')
+        Post.objects.create(author=self.user, text='Пост группы', group=group)
+        url = reverse('posts:homepage')
+        self.client.get(url)
+        self.user.first_name = 'Новое'
+        self.user.last_name = 'Имя'
+        self.user.save()
+        group.slug = 'new_slug'
+        group.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Автор: Новое Имя')
+        self.assertContains(response, '/group/new_slug/')
+        self.assertNotContains(response, '/group/old_slug/')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:homepage'),
+            reverse('posts:homepage') + '?cursor=',
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_pages_have_validators(self):
+        '''Ленты отдают ETag, страница поста - ETag и Last-Modified'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertEqual(
+                    response.has_header('Last-Modified'),
+                    url == self.urls[-1]
+                )
+
+    def assertEtagsChanged(self, etags):
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_card_changes_change_feed_etag(self):
+        '''Новое имя автора и новый slug группы в карточках меняют ETag
+        лент'''
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое имя'
+        user.save()
+        self.assertEtagsChanged(etags)
+        index_urls = self.urls[:2]
+        etags = {url: self.client.get(url)['ETag'] for url in index_urls}
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed_group'
+        group.save()
+        self.assertEtagsChanged(etags)
+
+    def test_feed_ignores_if_modified_since(self):
+        '''Удаление поста не двигает время изменения страницы ленты,
+        поэтому лента не отвечает 304 по If-Modified-Since'''
+        url = reverse('posts:homepage')
+        Post.objects.create(author=self.user, text='Удаляемый пост')
+        self.client.get(url)
+        since = self.client.get(self.urls[-1])['Last-Modified']
+        Post.objects.filter(text='Удаляемый пост').delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Удаляемый пост')
+
+    def test_not_modified_skips_rendering(self):
+        '''Ответ 304 отдаётся без вызова шаблонизатора'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                validators = {'HTTP_IF_NONE_MATCH': response['ETag']}
+                if response.has_header('Last-Modified'):
+                    validators['HTTP_IF_MODIFIED_SINCE'] = (
+                        response['Last-Modified']
+                    )
+                for header, value in validators.items():
+                    with mock.patch.object(
+                        Template, 'render', side_effect=AssertionError
+                    ):
+                        response = self.client.get(url, **{header: value})
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.templates, [])
+                    self.assertEqual(response.content, b'')
+
+    def test_edit_changes_validators(self):
+        '''После правки поста старый ETag больше не подходит'''
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Изменённый пост', 'group': self.group.pk}
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        '''Гость и пользователь получают разные ETag'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.client.get(url)['ETag'],
+                    self.author_client.get(url)['ETag']
+                )
+
+    @override_settings(POSTS_PAGE_CACHE=True)
+    def test_cached_page_answers_not_modified(self):
+        '''Страница из кэша отвечает 304 без запросов к БД'''
+        url = reverse('posts:homepage')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(POSTS_PAGE_CACHE_HOLES=True)
+class HolePunchedFeedPageCacheTests(FeedPageCacheTests):
+    '''Те же проверки для общей на всех копии страницы'''
+
+    def test_one_copy_for_everyone(self):
+        '''Пользователи получают общую страницу со своими фрагментами'''
+        other_client = Client()
+        other_client.force_login(self.other_user)
+        self.client.get(self.index_url)
+        with mock.patch.object(
+            Template, 'render', autospec=True, side_effect=Template.render
+        ) as render:
+            response = self.author_client.get(self.index_url)
+        # Рендерится только шапка
+        self.assertEqual(
+            [call.args[0].name for call in render.call_args_list],
+            ['includes/header.html']
+        )
+        self.assertContains(response, 'Пользователь: test_user')
+        response = other_client.get(self.index_url)
+        self.assertContains(response, 'Пользователь: other_user')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_authorized_hit_skips_page_queries(self):
+        self.author_client.get(self.index_url)
+        with self.assertNumQueries(2):
+            # Только сессия и пользователь
+            self.author_client.get(self.index_url)
+
+    def test_post_detail_edit_button(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        other_client = Client()
+        other_client.force_login(self.other_user)
+        self.assertNotContains(other_client.get(url), 'редактировать запись')
+        with mock.patch('posts.views.post_source') as post_source:
+            response = self.author_client.get(url)
+        post_source.assert_not_called()
+        self.assertContains(response, 'редактировать запись')
+        self.assertNotContains(self.client.get(url), 'редактировать запись')
+
+    def test_post_detail_purged_on_edit(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Исправленный пост', 'group': self.group.pk}
+        )
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+
+    def test_post_detail_follows_author_posts(self):
+        '''Новый пост автора меняет счётчик на страницах его постов'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'Всего постов автора: 1')
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertContains(self.client.get(url), 'Всего постов автора: 2')
+
+    def test_etag_per_viewer(self):
+        '''ETag общей страницы различается для пользователей'''
+        guest_etag = self.client.get(self.index_url)['ETag']
+        author_etag = self.author_client.get(self.index_url)['ETag']
+        self.assertNotEqual(guest_etag, author_etag)
+        response = self.author_client.get(
+            self.index_url, HTTP_IF_NONE_MATCH=author_etag
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.author_client.get(
+            self.index_url, HTTP_IF_NONE_MATCH=guest_etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_personal_etag_on_cache_miss(self):
+        '''Персональный ETag подходит и когда страницы нет в кэше'''
+        for url in (
+            self.index_url,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                etag = self.author_client.get(url)['ETag']
+                cache.clear()
+                response = self.author_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_error_page_without_markers(self):
+        response = self.client.get(reverse(
+            'posts:group_posts', kwargs={'slug': 'missing'}
+        ))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(response, '<!--hole:', status_code=404)
@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def write_jsonl(self, rows, name='posts.jsonl'):
+        return self.write(name, ''.join(
+            json.dumps(row, ensure_ascii=False) + '\n' for row in rows
+        ))
+
+    def import_posts(self, path, *args):
+        call_command(
+            'import_posts', path, *args, stdout=StringIO(), stderr=StringIO()
+        )
+
+    def test_import_jsonl(self):
+        '''Посты из JSON Lines создаются с автором и группой'''
+        path = self.write_jsonl([
+            {'text': 'Первый пост', 'author': 'test_user',
+             'group': 'test_group'},
+            {'text': 'Второй пост', 'author': 'test_user'},
+        ])
+        self.import_posts(path, '--batch-size', '1')
+        self.assertTrue(Post.objects.filter(
+            text='Первый пост', author=self.user, group=self.group
+        ).exists())
+        self.assertTrue(Post.objects.filter(
+            text='Второй пост', group=None
+        ).exists())
+
+    def test_import_csv_keeps_dates(self):
+        '''--keep-dates сохраняет исходную дату публикации'''
+        path = self.write(
+            'posts.csv',
+            'text,author,group,pub_date\n'
+            'Старый пост,test_user,test_group,2015-03-01T12:00:00\n'
+        )
+        self.import_posts(path, '--keep-dates')
+        post = Post.objects.get(text='Старый пост')
+        expected = timezone.make_aware(datetime(2015, 3, 1, 12))
+        self.assertEqual(post.pub_date, expected)
+        self.assertEqual(post.updated, expected)
+
+    def test_invalid_rows_skipped(self):
+        '''Строки с неизвестным автором или группой пропускаются'''
+        path = self.write_jsonl([
+            {'text': 'Без автора', 'author': 'nobody'},
+            {'text': 'Без группы', 'author': 'test_user', 'group': 'nope'},
+            {'text': 'Нормальный пост', 'author': 'test_user'},
+        ])
+        self.import_posts(path)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Нормальный пост']
+        )
+
+    def test_malformed_rows_skipped(self):
+        '''Битый JSON, запись не-объект и неверная дата не прерывают
+        импорт, а пропускаются с номером строки'''
+        path = self.write('posts.jsonl', '\n'.join((
+            '{"text": "Оборванная строка", "author": ',
+            '["не", "объект"]',
+            '{"text": "Неверная дата", "author": "test_user", '
+            '"pub_date": "2024-13-01T00:00:00"}',
+            '{"text": ["не", "строка"], "author": "test_user"}',
+            '{"text": "Нормальный пост", "author": "test_user"}',
+        )))
+        stderr = StringIO()
+        call_command(
+            'import_posts', path, '--keep-dates',
+            stdout=StringIO(), stderr=stderr
+        )
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Нормальный пост']
+        )
+        for number in range(1, 5):
+            self.assertIn(f'Строка {number}:', stderr.getvalue())
+
+    def test_derived_data_rebuilt(self):
+        '''После импорта верны счётчики и находятся новые посты'''
+        path = self.write_jsonl([
+            {'text': f'Импортированный пост {i}', 'author': 'test_user',
+             'group': 'test_group'}
+            for i in range(3)
+        ])
+        self.import_posts(path, '--chunk-size', '2')
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(self.user.stats.posts_count, 3)
+        self.assertEqual(search_posts('импортированный').count(), 3)
+
+    def test_resume_skips_committed_rows(self):
+        '''--resume продолжает с контрольной точки, файл точки удаляется'''
+        path = self.write_jsonl([
+            {'text': f'Пост {i}', 'author': 'test_user'} for i in range(5)
+        ])
+        checkpoint = self.write('posts.jsonl.checkpoint', '{"rows": 3}')
+        self.import_posts(path, '--resume')
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 3', 'Пост 4']
+        )
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост в группе', group=cls.group
+        )
+        Post.objects.create(author=cls.staff, text='Пост, "с" кавычками')
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.url = reverse('posts:export')
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_export_jsonl(self):
+        '''Каждый пост - строка JSON с автором, группой и датой'''
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], {
+            'text': 'Пост в группе',
+            'author': 'test_user',
+            'group': 'test_group',
+            'pub_date': self.post.pub_date.isoformat(),
+        })
+
+    def test_export_filters(self):
+        '''Фильтры по группе, автору и периоду'''
+        cases = {
+            ('--group', 'test_group'): 1,
+            ('--author', 'staff'): 1,
+            ('--since', '2000-01-01', '--until', '2000-12-31'): 0,
+            ('--until', timezone.localdate().isoformat()): 2,
+        }
+        for args, expected in cases.items():
+            with self.subTest(args=args):
+                lines = self.export(*args).splitlines()
+                self.assertEqual(len(lines), expected)
+
+    def test_export_import_round_trip(self):
+        '''Выгрузка CSV загружается обратно командой import_posts'''
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        path = os.path.join(temp_dir, 'posts.csv')
+        call_command('export_posts', path)
+        Post.objects.all().delete()
+        call_command(
+            'import_posts', path, '--keep-dates',
+            stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(group=self.group)
+        self.assertEqual(post.pub_date, self.post.pub_date)
+
+    def test_endpoint_streams_for_staff(self):
+        '''Персонал получает потоковый ответ с вложением'''
+        response = self.staff_client.get(self.url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(
+            content.splitlines()[0], 'text,author,group,pub_date'
+        )
+        self.assertIn('"Пост, ""с"" кавычками"', content)
+
+    def test_endpoint_closed_for_others(self):
+        '''Гость и обычный пользователь выгрузку не получают'''
+        user_client = Client()
+        user_client.force_login(self.user)
+        for client in (self.client, user_client):
+            with self.subTest(client=client):
+                self.assertEqual(client.get(self.url).status_code, 302)
+
+    def test_endpoint_rejects_bad_params(self):
+        '''Неизвестный формат или дата - ответ 400'''
+        for params in ({'format': 'xml'}, {'since': 'вчера'}):
+            with self.subTest(params=params):
+                response = self.staff_client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
@@ -1,6 +1,10 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, Client
 from posts.models import Group, Post, User
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from posts.forms import PostForm
 
@@ -97,3 +101,84 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(
                 text='Изменённый тестовый пост'
             ).exists())
+
+
+class PostEditTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-'
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Исходный текст', group=self.group
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+
+    def edit(self, text, version):
+        return self.client.post(self.url, {
+            'text': text, 'group': self.group.pk, 'version': version
+        })
+
+    def test_get_uses_unbound_form(self):
+        '''Форма на GET не связана: группа поста остаётся выбранной'''
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['form'].is_bound)
+        self.assertContains(
+            response, 'name="version" value="0"'
+        )
+        self.assertContains(response, self.group.title)
+
+    def test_not_author_skips_form(self):
+        '''Чужой пост: редирект до какой-либо работы с формой'''
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        with mock.patch('posts.views.PostForm') as form_class:
+            response = other.post(self.url, {'text': 'Чужая правка'})
+        form_class.assert_not_called()
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        ))
+
+    def test_concurrent_edit_conflict(self):
+        '''Вторая правка той же версии получает 409 и не затирает первую'''
+        self.assertEqual(self.edit('Первая правка', 0).status_code, 302)
+        response = self.edit('Вторая правка', 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'Первая правка', status_code=409)
+        self.assertContains(
+            response, 'name="version" value="1"', status_code=409
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Первая правка')
+        self.assertEqual(self.post.version, 1)
+        # Повторная отправка с актуальной версией сохраняется
+        self.assertEqual(self.edit('Вторая правка', 1).status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Вторая правка')
+
+    def test_saves_only_changed_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.edit('Новый текст', 0)
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertNotIn('"author_id"', updates[1])
+        self.assertNotIn('"group_id"', updates[1])
+        self.assertIn('"text"', updates[1])
+
+    def test_unchanged_form_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.edit('Исходный текст', 0)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ])
+
+    def test_invalid_version(self):
+        for version in ('abc', '', '²', '١', '-1', str(2 ** 63)):
+            with self.subTest(version=version):
+                self.assertEqual(self.edit('Текст', version).status_code, 400)
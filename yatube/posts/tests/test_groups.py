@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import groups
+from ..forms import PostForm
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class GroupCacheTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-'
+        )
+        groups.invalidate()
+
+    def test_lookup_without_queries(self):
+        '''Прогретый кэш отвечает без запросов к БД'''
+        groups.all_groups()
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.get_by_slug('test_group'), self.group)
+            self.assertEqual(groups.get_by_pk(self.group.pk), self.group)
+            self.assertEqual(list(groups.all_groups()), [self.group])
+            self.assertIsNone(groups.get_by_slug('missing'))
+
+    def test_save_invalidates(self):
+        '''Правка группы, в том числе из админки, сбрасывает кэш'''
+        groups.all_groups()
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(
+            groups.get_by_slug('test_group').title, 'Новое название'
+        )
+        response = self.client.get(
+            reverse('posts:group_posts', kwargs={'slug': 'test_group'})
+        )
+        self.assertContains(response, 'Новое название')
+
+    def test_delete_invalidates(self):
+        groups.all_groups()
+        self.group.delete()
+        with self.assertRaises(Http404):
+            groups.get_group_or_404('test_group')
+
+    def test_post_count_not_cached(self):
+        '''Новый пост не сбрасывает кэш групп: счётчика в нём нет, он
+        читается из строки группы'''
+        user = User.objects.create_user(username='test_user')
+        groups.all_groups()
+        version = groups.get_cache().get(groups.VERSION_KEY)
+        Post.objects.create(author=user, text='Пост', group=self.group)
+        self.assertEqual(groups.get_cache().get(groups.VERSION_KEY), version)
+        group = groups.get_by_slug('test_group')
+        self.assertIn('posts_count', group.get_deferred_fields())
+        self.assertEqual(groups.posts_count(group), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.posts_count(group), 1)
+        Post.objects.create(author=user, text='Пост', group=self.group)
+        self.assertEqual(groups.posts_count(group), 2)
+
+    def test_shared_version(self):
+        '''Сброс в другом процессе виден копии в памяти процесса'''
+        groups.all_groups()
+        Group.objects.filter(pk=self.group.pk).update(title='Без сигнала')
+        self.assertEqual(groups.get_by_slug('test_group').title,
+                         'Тестовая группа')
+        groups.get_cache().delete(groups.VERSION_KEY)
+        self.assertEqual(groups.get_by_slug('test_group').title,
+                         'Без сигнала')
+
+
+class GroupSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Group.objects.bulk_create(
+            Group(title=title, slug=slug, description='-')
+            for title, slug in (
+                ('Кошки', 'cats'),
+                ('Котлеты', 'cutlets'),
+                ('Собаки', 'dogs'),
+                ('Catering', 'food'),
+            )
+        )
+
+    def setUp(self):
+        # bulk_create не шлёт сигналы, сбрасывающие кэш групп
+        groups.invalidate()
+
+    def search(self, query):
+        response = self.client.get(
+            reverse('posts:group_search'), {'q': query}
+        )
+        return [group['slug'] for group in response.json()['results']]
+
+    def test_prefix_search(self):
+        """Поиск по началу названия и slug; первая буква названия - в
+        любом регистре"""
+        cases = {
+            'Ко': ['cutlets', 'cats'],
+            'кош': ['cats'],
+            'cat': ['food', 'cats'],
+            'do': ['dogs'],
+            'ы': [],
+            ' ': [],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+
+    def test_search_uses_indexes(self):
+        with CaptureQueriesContext(connection) as queries:
+            groups.search('Ко')
+        sql = queries.captured_queries[0]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' | '.join(row[-1] for row in cursor)
+        self.assertIn('group_title_idx', plan)
+        self.assertNotIn('SCAN posts_group', plan)
+
+    def test_form_renders_only_selected_group(self):
+        user = User.objects.create_user(username='test_user')
+        post = Post.objects.create(
+            author=user, text='Пост', group=Group.objects.get(slug='dogs')
+        )
+        form = PostForm(instance=post)
+        html = str(form['group'])
+        self.assertIn('Собаки', html)
+        self.assertNotIn('Кошки', html)
+        self.assertIn('data-search-url', html)
+        self.assertIn('js/group_search.js', str(form.media))
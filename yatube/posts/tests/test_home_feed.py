@@ -0,0 +1,148 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import home_feed
+from ..models import Group, HomeFeedEntry, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_HOME_FEED=True, POSTS_HOME_FEED_SIZE=3)
+class HomeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='test_user', first_name='Иван', last_name='Петров'
+        )
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Тестовый пост {i}', group=self.group
+            )
+            for i in range(5)
+        ]
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def assertConsistent(self):
+        self.assertEqual(home_feed.diff(), [])
+
+    def test_new_posts_kept_within_size(self):
+        '''Лента хранит заданное число новейших постов'''
+        self.assertEqual(HomeFeedEntry.objects.count(), 3)
+        self.assertConsistent()
+
+    def test_first_page_read_from_feed(self):
+        '''Первая страница главной собирается из материализованной ленты'''
+        with self.settings(POSTS_HOME_FEED_SIZE=10):
+            home_feed.rebuild()
+            # update() не шлёт сигналов: лента хранит прежний текст
+            Post.objects.filter(pk=self.posts[-1].pk).update(
+                text='Скрытая правка'
+            )
+            response = self.client.get(reverse('posts:homepage'))
+        self.assertContains(response, 'Тестовый пост 4')
+        self.assertContains(response, 'Иван Петров')
+        self.assertContains(response, self.group.slug)
+        self.assertNotContains(response, 'Скрытая правка')
+
+    def test_first_page_without_joins(self):
+        '''Посты первой страницы читаются без запросов к Post'''
+        with self.settings(POSTS_HOME_FEED_SIZE=10):
+            home_feed.rebuild()
+            page_obj = home_feed.HomeFeedPaginator(
+                Post.objects.for_feed(), 2, len(self.posts)
+            ).page(1)
+            with self.assertNumQueries(0):
+                texts = [post.text for post in page_obj]
+                names = [post.author.get_full_name() for post in page_obj]
+                titles = [post.group.title for post in page_obj]
+        self.assertEqual(texts, ['Тестовый пост 4', 'Тестовый пост 3'])
+        self.assertEqual(names, ['Иван Петров'] * 2)
+        self.assertEqual(titles, [self.group.title] * 2)
+
+    def test_first_page_single_query(self):
+        '''Первая страница главной - один запрос к ленте: число постов
+        хранится в кэше, а записи ленты валидаторы и страница читают
+        один раз'''
+        url = reverse('posts:homepage')
+        with self.settings(POSTS_HOME_FEED_SIZE=10):
+            home_feed.rebuild()
+            self.client.get(url)
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.context['page_obj'].paginator.count, 5)
+            Post.objects.create(author=self.user, text='Новый пост')
+            response = self.client.get(url)
+            self.assertEqual(response.context['page_obj'].paginator.count, 6)
+            self.posts[0].delete()
+            response = self.client.get(url)
+            self.assertEqual(response.context['page_obj'].paginator.count, 5)
+
+    def test_entries_without_group_queries(self):
+        '''Группа записи берётся из кэша групп, а не запросом на пост'''
+        posts = list(home_feed.feed_posts(10))
+        with self.assertNumQueries(0):
+            entries = [home_feed.entry_for(post) for post in posts]
+        self.assertEqual(
+            {entry.group_slug for entry in entries}, {self.group.slug}
+        )
+
+    def test_incomplete_feed_falls_back_to_posts(self):
+        '''Незаполненная лента не подменяет первую страницу'''
+        HomeFeedEntry.objects.all().delete()
+        response = self.client.get(reverse('posts:homepage'))
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_edit_updates_entry(self):
+        '''Правка поста через post_edit обновляет запись ленты'''
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other_group', description='-'
+        )
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.posts[-1].pk}),
+            {'text': 'Изменённый пост', 'group': other_group.pk}
+        )
+        entry = HomeFeedEntry.objects.get(pk=self.posts[-1].pk)
+        self.assertEqual(entry.text, 'Изменённый пост')
+        self.assertEqual(entry.group_slug, 'other_group')
+        self.assertConsistent()
+
+    def test_delete_refills_feed(self):
+        '''После удаления место в ленте занимает следующий пост'''
+        Post.objects.filter(
+            pk__in=[self.posts[4].pk, self.posts[3].pk]
+        ).delete()
+        self.assertEqual(HomeFeedEntry.objects.count(), 3)
+        self.assertConsistent()
+
+    def test_author_and_group_changes(self):
+        '''Переименование автора и группы, удаление группы'''
+        self.user.first_name = 'Пётр'
+        self.user.save()
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertConsistent()
+        self.group.delete()
+        self.assertConsistent()
+
+    def test_check_and_rebuild_commands(self):
+        '''check_home_feed находит расхождения, rebuild_home_feed чинит'''
+        HomeFeedEntry.objects.filter(pk=self.posts[-1].pk).delete()
+        with self.assertRaises(CommandError):
+            call_command(
+                'check_home_feed', stdout=StringIO(), stderr=StringIO()
+            )
+        call_command('rebuild_home_feed', stdout=StringIO())
+        out = StringIO()
+        call_command('check_home_feed', stdout=out)
+        self.assertIn('согласована', out.getvalue())
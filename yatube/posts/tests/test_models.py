@@ -1,7 +1,13 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import AuthorStats, Group, Post
 
 User = get_user_model()
 
@@ -74,3 +80,108 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     test_post._meta.get_field(value).help_text, expected)
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author_count, group_count, other_count=0):
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count,
+            author_count
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_count)
+
+    def create_posts(self, amount):
+        return [
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}', group=self.group
+            )
+            for i in range(amount)
+        ]
+
+    def test_counters_follow_create_and_delete(self):
+        """Счётчики растут при создании и уменьшаются при удалении"""
+        posts = self.create_posts(3)
+        self.assertCounters(3, 3)
+        posts[0].delete()
+        self.assertCounters(2, 2)
+        Post.objects.filter(author=self.user).delete()
+        self.assertCounters(0, 0)
+
+    def test_counters_follow_group_change(self):
+        """Смена группы переносит пост между счётчиками групп"""
+        post = self.create_posts(1)[0]
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.group = None
+        post.save()
+        self.assertCounters(1, 0, 0)
+
+    def test_group_delete_keeps_author_counter(self):
+        """Удаление группы (SET_NULL) не трогает счётчик автора"""
+        self.create_posts(2)
+        Group.objects.all().delete()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, 2
+        )
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_admin_delete_action_updates_counters(self):
+        """Удаление постов действием админки обновляет счётчики"""
+        posts = self.create_posts(3)
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_selected',
+            'post': 'yes',
+            '_selected_action': [post.pk for post in posts[:2]],
+        })
+        self.assertCounters(1, 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        """rebuild_post_counters восстанавливает испорченные счётчики"""
+        self.create_posts(2)
+        AuthorStats.objects.update(posts_count=100)
+        Group.objects.update(posts_count=100)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(2, 2)
+
+    def test_profile_and_group_use_stored_count(self):
+        """Профиль и группа берут число постов из счётчика"""
+        self.create_posts(12)
+        urls = (
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                paginator = response.context['page_obj'].paginator
+                self.assertEqual(paginator.count, 12)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
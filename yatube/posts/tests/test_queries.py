@@ -0,0 +1,214 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import groups
+from ..forms import PostForm
+from ..management.commands.rebuild_post_counters import (
+    rebuild_post_counters
+)
+from ..models import Group, Post
+
+User = get_user_model()
+
+# Бюджет запросов на страницу ленты из 10 постов.
+# Гость: COUNT + страница (+ поиск автора; группа - из кэша групп).
+# Авторизованный: плюс сессия и пользователь.
+GUEST_FEED_BUDGET = 3
+AUTHORIZED_FEED_BUDGET = 5
+# Страница поста: пост с автором и его счётчиком постов одним запросом,
+# группа - из кэша групп. Авторизованному - плюс сессия и пользователь
+GUEST_DETAIL_BUDGET = 1
+AUTHORIZED_DETAIL_BUDGET = 3
+
+
+class FeedQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create_user(username='test_user')
+        # У каждого поста свой автор, чтобы N+1 по авторам был заметен
+        for i in range(12):
+            author = User.objects.create_user(
+                username=f'author_{i}', first_name='Автор', last_name=str(i)
+            )
+            Post.objects.create(
+                author=author, text=f'Тестовый пост {i}', group=cls.group
+            )
+        for i in range(12):
+            Post.objects.create(
+                author=cls.user, text=f'Пост автора {i}', group=cls.group
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        # Бюджет - для прогретого кэша групп, как в работающем процессе
+        groups.invalidate()
+        groups.all_groups()
+        groups.forget_posts_counts([self.group.pk])
+        groups.posts_count(self.group)
+
+    def feed_urls(self):
+        return (
+            reverse('posts:homepage'),
+            reverse('posts:homepage') + '?page=2',
+            reverse('posts:homepage') + '?cursor=',
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+
+    def assertQueryBudget(self, client, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_guest_feed_query_budget(self):
+        '''Страница ленты для гостя укладывается в бюджет запросов'''
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, GUEST_FEED_BUDGET)
+
+    def test_authorized_feed_query_budget(self):
+        '''Страница ленты для пользователя укладывается в бюджет запросов'''
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                self.assertQueryBudget(
+                    self.authorized_client, url, AUTHORIZED_FEED_BUDGET
+                )
+
+    def test_for_feed_single_query(self):
+        '''for_feed загружает автора одним запросом, группа - из кэша'''
+        with self.assertNumQueries(1):
+            for post in Post.objects.for_feed()[:10]:
+                post.author.get_full_name()
+                groups.get_by_pk(post.group_id).slug
+
+    def test_group_page_without_group_query(self):
+        '''Страница группы не ищет группу в БД: валидаторы и страница'''
+        url = reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_post_form_without_group_queries(self):
+        '''Форма выводит выбранную группу без запросов к группам'''
+        post = self.user.posts.first()
+        with CaptureQueriesContext(connection) as queries:
+            html = str(PostForm(instance=post)['group'])
+        self.assertIn(self.group.title, html)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_group"' in query['sql']
+        ])
+
+
+class PostDetailQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='test_user', first_name='Тест', last_name='Автор'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group', description='-'
+        )
+        for i in range(3):
+            cls.post = Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group
+            )
+
+    def setUp(self):
+        groups.invalidate()
+        groups.all_groups()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_guest_detail_budget(self):
+        with self.assertNumQueries(GUEST_DETAIL_BUDGET):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Всего постов автора: 3')
+        self.assertContains(response, self.group.title)
+        self.assertContains(response, 'Тест Автор')
+
+    def test_authorized_detail_budget(self):
+        client = Client()
+        client.force_login(self.user)
+        with self.assertNumQueries(AUTHORIZED_DETAIL_BUDGET):
+            response = client.get(self.url)
+        self.assertContains(response, 'редактировать запись')
+
+    def test_count_without_stats_row(self):
+        """Без строки AuthorStats число постов считается по таблице"""
+        self.user.stats.delete()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Всего постов автора: 3')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        self.assertContains(response, 'Всего постов: 3')
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN - SQLite')
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(30)
+        )
+        # bulk_create не шлёт сигналы - пересчитываем счётчики вручную
+        rebuild_post_counters()
+
+    def feed_query_plans(self, url):
+        '''Планы выполнения выборок постов, сделанных view'''
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        plans = []
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if 'FROM "posts_post"' in sql and 'LIMIT' in sql:
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans.append(' | '.join(row[-1] for row in cursor))
+        return plans
+
+    def test_feeds_use_index_without_sorting(self):
+        '''Ленты читают посты по индексу без временной сортировки'''
+        urls = {
+            reverse('posts:homepage'): 'post_pub_date_id_idx',
+            reverse(
+                'posts:group_posts', kwargs={'slug': self.group.slug}
+            ): 'post_group_pub_date_idx',
+            reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ): 'post_author_pub_date_idx',
+        }
+        for url, index in urls.items():
+            for mode in ('', '?page=2', '?cursor='):
+                with self.subTest(url=url + mode):
+                    plans = self.feed_query_plans(url + mode)
+                    self.assertTrue(plans)
+                    for plan in plans:
+                        self.assertIn(index, plan)
+                        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,140 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, PostSearchToken
+from ..search import fts_available, rebuild_index, search_posts
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.rare = Post.objects.create(
+            author=cls.user, text='Кошка спит на окне'
+        )
+        cls.frequent = Post.objects.create(
+            author=cls.user, text='Кошка, кошка и ещё раз кошка на окне'
+        )
+        Post.objects.create(author=cls.user, text='Собака гуляет во дворе')
+
+    def search(self, query):
+        return list(search_posts(query).values_list('text', flat=True))
+
+    def test_search_finds_all_words(self):
+        '''Находятся посты со всеми словами запроса, без учёта регистра'''
+        self.assertEqual(
+            set(self.search('КОШКА окне')),
+            {self.rare.text, self.frequent.text}
+        )
+        self.assertEqual(self.search('кошка двор'), [])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_search_is_ranked(self):
+        '''Пост с большим числом вхождений слова выше в выдаче'''
+        self.assertEqual(
+            self.search('кошка'), [self.frequent.text, self.rare.text]
+        )
+
+    def test_index_follows_edit_and_delete(self):
+        '''Индекс обновляется при правке и удалении поста'''
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'Попугай сидит на окне'
+        post.save()
+        self.assertEqual(self.search('попугай'), [post.text])
+        self.assertNotIn(post.text, self.search('кошка'))
+        post.delete()
+        self.assertEqual(self.search('попугай'), [])
+
+    def test_query_operators_are_escaped(self):
+        '''Служебный синтаксис FTS в запросе не вызывает ошибок'''
+        for query in ('кошка OR', '"кошка', 'NEAR(кошка', 'text:кошка'):
+            with self.subTest(query=query):
+                self.search(query)
+
+    def test_search_page(self):
+        '''Страница поиска выводит найденные посты и держит q в ссылках'''
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Кошка номер {i}')
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;page=2'
+        )
+        response = self.client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идёт через поисковый индекс'''
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        with mock.patch(
+            'posts.admin.search_posts', wraps=search_posts
+        ) as searched:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'собака'}
+            )
+        searched.assert_called_once()
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_rebuild_command(self):
+        '''rebuild_search_index восстанавливает индекс'''
+        Post.objects.filter(pk=self.rare.pk).update(text='Хомяк')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('хомяк'), ['Хомяк'])
+
+
+class TokenTableSearchTests(PostSearchTests):
+    '''Те же проверки для запасного индекса PostSearchToken'''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.no_fts = mock.patch(
+            'posts.search.fts_available', return_value=False
+        )
+        cls.no_fts.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.no_fts.stop()
+
+    def test_rebuild_batches_inserts(self):
+        '''Перестроение вставляет слова пачками, а не запросом на пост'''
+        Post.objects.bulk_create(
+            Post(author=self.rare.author, text=f'Пост {number}')
+            for number in range(20)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rebuild_index(), Post.objects.count())
+        self.assertLess(len(queries), 10)
+        self.assertEqual(len(search_posts('пост')), 20)
+
+    def test_tokens_stored(self):
+        '''Слова поста и их число хранятся в PostSearchToken'''
+        self.assertEqual(
+            PostSearchToken.objects.get(
+                post=self.frequent, token='кошка'
+            ).weight,
+            3
+        )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 - только SQLite')
+class FtsBackendTests(TestCase):
+    def test_sqlite_uses_fts(self):
+        '''На SQLite с FTS5 используется виртуальная таблица'''
+        self.assertTrue(fts_available())
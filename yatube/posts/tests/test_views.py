@@ -1,6 +1,13 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from ..models import Group, Post
+from ..paginators import (
+    CursorPage, CursorPaginator, InvalidCursor, decode_cursor
+)
+from ..views import get_page_window
 from django.urls import reverse
 from django.core.paginator import Page
 from django import forms
@@ -342,3 +349,143 @@ class PostAdditionalCheck(TestCase):
         self.assertEqual(posts_pub_date_0, self.post.pub_date)
         self.assertEqual(posts_author_0, self.post.author)
         self.assertEqual(posts_group_0, self.post.group)
+
+
+class PostsCursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        for i in range(1, 24):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group
+            )
+        cls.urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+        )
+
+    def walk_forward(self, url):
+        '''Обход ленты по ссылкам "Следующая" до конца'''
+        pages = []
+        response = self.client.get(url + '?cursor=')
+        while True:
+            page_obj = response.context['page_obj']
+            pages.append([post.text for post in page_obj])
+            if not page_obj.has_next():
+                return pages, page_obj
+            response = self.client.get(
+                url + '?cursor=' + page_obj.next_cursor
+            )
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        '''Курсорные страницы по порядку отдают всю ленту без повторов'''
+        expected = [f'Тестовый пост {i}' for i in range(23, 0, -1)]
+        for url in self.urls:
+            with self.subTest(url=url):
+                pages, _ = self.walk_forward(url)
+                self.assertEqual([len(page) for page in pages], [10, 10, 3])
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_cursor_previous_returns_same_page(self):
+        '''Ссылка "Предыдущая" возвращает ровно предыдущую страницу'''
+        url = reverse('posts:homepage')
+        first = self.client.get(url + '?cursor=').context['page_obj']
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            url + '?cursor=' + first.next_cursor
+        ).context['page_obj']
+        back = self.client.get(
+            url + '?cursor=' + second.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_cursor_mode_does_not_count(self):
+        '''В курсорном режиме страница - один запрос без COUNT'''
+        pages, last = self.walk_forward(reverse('posts:homepage'))
+        token = last.previous_cursor
+        with self.assertNumQueries(1) as queries:
+            list(CursorPaginator(Post.objects.all(), 10).get_page(token))
+        self.assertNotIn('COUNT', queries.captured_queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'])
+
+    def test_broken_cursor_shows_first_page(self):
+        '''Повреждённый токен не ломает страницу'''
+        response = self.client.get(
+            reverse('posts:homepage') + '?cursor=not-a-cursor'
+        )
+        self.assertEqual(
+            response.context['page_obj'][0].text, 'Тестовый пост 23'
+        )
+
+    def test_forged_cursor_rejected(self):
+        '''Подделанный id вне диапазона БД или не число отклоняется'''
+        for pk in (2 ** 63, -2 ** 63 - 1, True, 1.5, '1'):
+            with self.subTest(pk=pk):
+                token = base64.urlsafe_b64encode(json.dumps(
+                    ['2021-01-01T00:00:00+00:00', pk, 'n']
+                ).encode()).decode()
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(token)
+                response = self.client.get(
+                    reverse('posts:homepage') + '?cursor=' + token
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_links_rendered(self):
+        '''Шаблон паджинатора выводит курсорные ссылки'''
+        response = self.client.get(reverse('posts:homepage') + '?cursor=')
+        page_obj = response.context['page_obj']
+        self.assertContains(response, '?cursor=' + page_obj.next_cursor)
+        self.assertNotContains(response, '?page=')
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_cursor_mode_enabled_by_setting(self):
+        '''Настройка включает курсорный режим без параметра в URL'''
+        response = self.client.get(reverse('posts:homepage'))
+        self.assertIsInstance(response.context['page_obj'], CursorPage)
+
+
+class PageWindowTest(TestCase):
+    def test_page_window(self):
+        '''Окно паджинатора: края, соседи текущей страницы и пропуски'''
+        cases = {
+            (1, 1): [1],
+            (1, 5): [1, 2, 3, 4, 5],
+            (1, 100): [1, 2, 3, None, 100],
+            (50, 100): [1, None, 48, 49, 50, 51, 52, None, 100],
+            (4, 100): [1, 2, 3, 4, 5, 6, None, 100],
+            (100, 100): [1, None, 98, 99, 100],
+        }
+        for (number, num_pages), expected in cases.items():
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(get_page_window(number, num_pages), expected)
+
+    def test_paginator_html_size_is_bounded(self):
+        '''Размер страницы не растёт с числом постов'''
+        user = User.objects.create_user(username='test_user')
+
+        def page_size(posts):
+            Post.objects.bulk_create(
+                Post(author=user, text='Тестовый пост')
+                for _ in range(posts - Post.objects.count())
+            )
+            response = self.client.get(reverse('posts:homepage') + '?page=5')
+            self.assertEqual(len(response.context['page_obj']), 10)
+            return len(response.content)
+
+        small = page_size(100)
+        large = page_size(10000)
+        # Отличаются только номера последней страницы; полный
+        # page_range добавил бы около 990 ссылок, это ~100 Кб
+        self.assertLess(large - small, 100)
@@ -13,6 +13,12 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Поиск по постам
+    path('search/', views.search, name='search'),
+    # Поиск группы для формы поста
+    path('groups/search/', views.group_search, name='group_search'),
+    # Выгрузка постов для персонала
+    path('export/', views.export_posts, name='export'),
     # Новая запись
     path('create/', views.post_create, name='post_create'),
     # Редактирование записи
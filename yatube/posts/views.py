@@ -1,62 +1,273 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
+from django.http import (
+    HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from .cache import (
+    cache_feed_page, group_scope, index_scope, post_page_scope, profile_scope
+)
+from .conditional import feed_condition, post_condition, request_cached
+from .export import (
+    CONTENT_TYPES, FORMATS, export_queryset, iter_rows, render as render_rows
+)
 from .forms import PostForm
-from .models import Group, Post, User
+from .groups import (
+    get_by_pk as get_group_by_pk, get_group_or_404,
+    posts_count as group_posts_count, search as search_groups
+)
+from .home_feed import (
+    HomeFeedPaginator, first_posts as home_feed_first_posts,
+    is_enabled as home_feed_enabled, posts_count as home_feed_posts_count,
+    serves as home_feed_serves
+)
+from .models import AuthorStats, Post, User
+from .paginators import CountedPaginator, CursorPaginator
+from .search import search_posts
 
 POSTS_AMOUNT = 10
+# Сколько соседних страниц показывать по обе стороны от текущей
+PAGE_WINDOW = 2
+# Наибольшая версия поста: больше не помещается в поле БД
+MAX_VERSION = 2 ** 31 - 1
+
+
+def is_cursor_mode(request):
+    """Курсорный режим (без OFFSET и COUNT) включается настройкой
+    POSTS_CURSOR_PAGINATION или параметром ?cursor= в запросе"""
+    return settings.POSTS_CURSOR_PAGINATION or 'cursor' in request.GET
+
 
+def get_page_obj(queryset, request, count=None):
+    """Создание Paginator с нужным queryset
 
-def get_page_obj(queryset, request):
-    """Создание Paginator с нужным queryset"""
-    paginator = Paginator(queryset, POSTS_AMOUNT)
+    Известное заранее число постов count избавляет от COUNT(*).
+    """
+    if is_cursor_mode(request):
+        paginator = CursorPaginator(queryset, POSTS_AMOUNT)
+        return paginator.get_page(request.GET.get('cursor'))
+    if count is None:
+        paginator = Paginator(queryset, POSTS_AMOUNT)
+    elif home_feed_serves(queryset):
+        paginator = HomeFeedPaginator(
+            queryset, POSTS_AMOUNT, count,
+            partial(home_feed_first_page, request)
+        )
+    else:
+        paginator = CountedPaginator(queryset, POSTS_AMOUNT, count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.page_window = get_page_window(
+        page_obj.number, paginator.num_pages
+    )
     return page_obj
 
 
+def get_page_window(number, num_pages, size=PAGE_WINDOW):
+    """Номера страниц для паджинатора: первая, последняя и size страниц
+    вокруг текущей; None на месте пропуска (многоточие в шаблоне).
+
+    Длина списка не зависит от числа страниц, поэтому шаблону не нужно
+    обходить весь paginator.page_range.
+    """
+    pages = {1, num_pages}
+    pages.update(range(
+        max(number - size, 1), min(number + size, num_pages) + 1
+    ))
+    window = []
+    for page in sorted(pages):
+        if window and page - window[-1] == 2:
+            # Пропуск в одну страницу выводим номером, а не многоточием
+            window.append(page - 1)
+        elif window and page - window[-1] > 2:
+            window.append(None)
+        window.append(page)
+    return window
+
+
+@request_cached
+def home_feed_first_page(request):
+    """Первая страница материализованной ленты: её читают и валидаторы,
+    и сама страница"""
+    return home_feed_first_posts(POSTS_AMOUNT)
+
+
+@request_cached
+def index_feed(request):
+    """Посты главной, их число и прочие данные страницы"""
+    if is_cursor_mode(request):
+        count = None
+    elif home_feed_enabled():
+        count = home_feed_posts_count()
+    else:
+        count = Post.objects.count()
+    return Post.objects.all(), count, ()
+
+
+@request_cached
+def group_feed(request, slug):
+    group = get_group_or_404(slug)
+    return (
+        group.posts.all(), group_posts_count(group),
+        (group, group.description)
+    )
+
+
+@request_cached
+def profile_feed(request, username):
+    user = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    try:
+        post_quantity = user.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        # Строка статистики появляется с первым постом автора; данные,
+        # загруженные без сигналов (loaddata), считаем, пока счётчики
+        # не пересчитает rebuild_post_counters
+        post_quantity = user.posts.count()
+    return user.posts.all(), post_quantity, (user, user.get_full_name())
+
+
+@request_cached
+def post_source(request, post_id):
+    """Пост и данные страницы поста, от которых зависит ETag"""
+    # Пост, автор и его счётчик постов - одним запросом, группа - из кэша
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats'), id=post_id
+    )
+    if post.group_id is not None:
+        post.group = get_group_by_pk(post.group_id)
+    try:
+        author_posts = post.author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        # Данные до появления счётчиков: считаем, пока их не пересчитает
+        # rebuild_post_counters
+        author_posts = post.author.posts.count()
+    return post, (post.author.get_full_name(), post.group, author_posts)
+
+
+def index_context(request):
+    posts, count, _ = index_feed(request)
+    return {
+        'page_obj': get_page_obj(posts.for_feed(), request, count)
+    }
+
+
+def group_context(request, slug):
+    posts, count, (group, _) = group_feed(request, slug)
+    return {
+        'group': group,
+        'page_obj': get_page_obj(posts.for_feed(), request, count)
+    }
+
+
+def profile_context(request, username):
+    posts, post_quantity, (user, _) = profile_feed(request, username)
+    return {
+        'username': user,
+        'post_quantity': post_quantity,
+        'page_obj': get_page_obj(posts.for_feed(), request, post_quantity)
+    }
+
+
+def post_context(request, post_id):
+    post, (_, _, author_posts) = post_source(request, post_id)
+    return {
+        'post': post,
+        'author_posts': author_posts,
+    }
+
+
+@cache_feed_page(index_scope)
+@feed_condition(index_feed)
 def index(request):
     """Главная страница"""
-    context = {
-        'page_obj': get_page_obj(Post.objects.all(), request)
-    }
-    return render(request, 'posts/index.html', context)
+    return render(request, 'posts/index.html', index_context(request))
 
 
+@cache_feed_page(group_scope)
+@feed_condition(group_feed)
 def group_posts(request, slug):
     """Получение постов нужной группы по запросу"""
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    context = {
-        'group': group,
-        'page_obj': get_page_obj(posts, request)
-    }
+    context = group_context(request, slug)
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_feed_page(profile_scope)
+@feed_condition(profile_feed)
 def profile(request, username):
     """Отображение профиля пользователя"""
-    # Код запроса к модели User
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    post_quantity = user.posts.count()
-    context = {
-        'username': user,
-        'post_quantity': post_quantity,
-        'page_obj': get_page_obj(post_list, request)
-    }
+    context = profile_context(request, username)
     return render(request, 'posts/profile.html', context)
 
 
+@cache_feed_page(post_page_scope)
+@post_condition(post_source)
 def post_detail(request, post_id):
     """Функция для просмотра поста"""
-    # Код запроса к модели Posts
-    post = get_object_or_404(Post, id=post_id)
+    context = post_context(request, post_id)
+    return render(request, 'posts/post_detail.html', context)
+
+
+def search(request):
+    """Поиск постов по тексту"""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        # Курсорный режим ранжированию не подходит: только номера страниц
+        paginator = Paginator(
+            search_posts(query, Post.objects.for_feed()), POSTS_AMOUNT
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_obj.page_window = get_page_window(
+            page_obj.number, paginator.num_pages
+        )
     context = {
-        'post': post
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/search.html', context)
+
+
+def group_search(request):
+    """Группы по началу названия или slug для выбора группы в форме"""
+    return JsonResponse(
+        {'results': search_groups(request.GET.get('q', ''))},
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+@staff_member_required
+def export_posts(request):
+    """Потоковая выгрузка постов для аналитики (только для персонала)"""
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    try:
+        queryset = export_queryset(
+            *(request.GET.get(name) for name in (
+                'since', 'until', 'group', 'author'
+            ))
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        render_rows(iter_rows(queryset), file_format),
+        content_type=CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{file_format}"'
+    )
+    return response
 
 
 @login_required
@@ -75,19 +286,71 @@ def post_create(request):
     return redirect('posts:profile', user.username)
 
 
+def parse_version(value):
+    """Версия поста из формы правки или None, если её не прислали;
+    ValueError - версия подделана"""
+    if value is None:
+        return None
+    # isdigit() пропускает символы вроде «²», которые int() не разберёт
+    if not (value.isascii() and value.isdecimal()):
+        raise ValueError(value)
+    version = int(value)
+    if version > MAX_VERSION:
+        raise ValueError(value)
+    return version
+
+
+def save_edit(post, fields, version):
+    """Сохранение изменённых полей fields правки поста, начатой с версии
+    version; False - пост успели изменить (конфликт).
+
+    Версия проверяется и увеличивается одним UPDATE в транзакции: до
+    конца сохранения строка заблокирована, и параллельная правка той же
+    версии проверку не пройдёт. Без version (клиент не прислал её)
+    пост сохраняется без проверки.
+    """
+    with transaction.atomic():
+        posts = Post.objects.filter(pk=post.pk)
+        if version is not None:
+            posts = posts.filter(version=version)
+        if not posts.update(version=F('version') + 1):
+            return False
+        # Сигналы post_save получают update_fields: поиск, счётчики и
+        # кэши обновляют только то, что поменялось
+        post.save(update_fields=[*fields, 'updated'])
+    if version is None:
+        post.refresh_from_db(fields=['version'])
+    else:
+        post.version = version + 1
+    return True
+
+
 @login_required
 def post_edit(request, post_id):
     """Функция для редактирования поста"""
     post = get_object_or_404(Post, pk=post_id)
-    form = PostForm(request.POST, instance=post)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
-    if form.is_valid():
-        form.save()
-        return redirect('posts:post_detail', post_id)
+    form = PostForm(request.POST or None, instance=post)
     context = {
-        'form': PostForm(instance=post),
+        'form': form,
         'post': post,
         'is_edit': True
     }
-    return render(request, 'posts/post_create.html', context)
+    if not form.is_valid():
+        return render(request, 'posts/post_create.html', context)
+    try:
+        version = parse_version(request.POST.get('version'))
+    except ValueError:
+        return HttpResponseBadRequest('Неверная версия поста')
+    if form.changed_data and not save_edit(
+        post, form.changed_data, version
+    ):
+        # Форма с правкой пользователя и актуальной версией поста:
+        # повторная отправка сознательно перезапишет чужие изменения
+        context['post'] = get_object_or_404(Post, pk=post_id)
+        context['conflict'] = True
+        return render(
+            request, 'posts/post_create.html', context, status=409
+        )
+    return redirect('posts:post_detail', post_id)
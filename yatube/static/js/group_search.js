@@ -0,0 +1,55 @@
+// Поиск группы по мере ввода для виджета GroupSearchWidget (posts/forms.py):
+// над списком появляется поле поиска, варианты приходят с data-search-url.
+(function () {
+  'use strict';
+
+  var DELAY = 200;
+
+  function setup(select) {
+    var input = document.createElement('input');
+    var timer = null;
+    var request = 0;
+    input.type = 'search';
+    input.className = 'form-control mb-2';
+    input.placeholder = 'Найти группу';
+    input.setAttribute('aria-label', 'Найти группу');
+    select.parentNode.insertBefore(input, select);
+
+    function fill(results) {
+      var keep = {};
+      Array.prototype.slice.call(select.options).forEach(function (option) {
+        if (option.value && !option.selected) {
+          select.removeChild(option);
+        } else {
+          keep[option.value] = true;
+        }
+      });
+      results.forEach(function (group) {
+        if (!keep[String(group.id)]) {
+          select.appendChild(new Option(group.title, group.id));
+        }
+      });
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var current = ++request;
+        var url = select.dataset.searchUrl + '?q=' +
+          encodeURIComponent(input.value);
+        fetch(url, {credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            // Ответ на устаревший запрос не затирает свежие варианты
+            if (current === request) {
+              fill(data.results);
+            }
+          });
+      }, DELAY);
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-search-url]').forEach(setup);
+  });
+}());
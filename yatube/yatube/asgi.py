@@ -0,0 +1,19 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own, the handler lives in core.asgi.
+Run with any ASGI server, for example::
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+from core.asgi import get_asgi_application  # noqa: E402
+from core.warmup import warm_on_startup  # noqa: E402
+
+application = get_asgi_application()
+warm_on_startup()
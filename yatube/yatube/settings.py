@@ -16,21 +16,63 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_list(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def replica_databases(default, paths):
+    """Настройки реплик по путям к файлам: {алиас: настройки}"""
+    return {
+        f'replica_{number}': dict(
+            default,
+            NAME=path,
+            # В тестах реплика - та же тестовая БД
+            TEST={'MIRROR': 'default'},
+        )
+        for number, path in enumerate(paths, start=1)
+    }
+
+
+# Профиль окружения: development (по умолчанию) или production.
+# Профиль задаёт значения по умолчанию, отдельные переменные DJANGO_*
+# окружения переопределяют их
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = '_cfhgfn+(%e1)&b418f8mobvh_zi9by2m5i28*tnmqg(@k-2&*'
+# В production ключ обязателен: с пустым SECRET_KEY Django не запустится
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    '' if PRODUCTION else '_cfhgfn+(%e1)&b418f8mobvh_zi9by2m5i28*tnmqg(@k-2&*'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = [
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [
     'localhost',
     '127.0.0.1',
     '[::1]',
     'testserver',
-]
+])
 
 
 # Application definition
@@ -50,25 +92,45 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Ближе к началу: ответ уменьшается после всех прочих middleware
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    # Последним: замеряет только view и рендер, без прочих middleware
+    'core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 # Путь к директории с шаблонами:
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Скомпилированные шаблоны хранятся в памяти процесса. Без отладки
+# включено по умолчанию; DJANGO_WARM_TEMPLATES компилирует все шаблоны
+# проекта при запуске процесса (core.warmup), а не при первом запросе
+TEMPLATES_CACHED = env_bool('DJANGO_TEMPLATE_CACHE', not DEBUG)
+TEMPLATES_WARM_ON_STARTUP = env_bool(
+    'DJANGO_WARM_TEMPLATES', PRODUCTION and TEMPLATES_CACHED
+)
+if TEMPLATES_CACHED:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         # Ищем шаблоны на уровне проекта
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -90,7 +152,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'DJANGO_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        # Постоянные соединения: воркер не открывает БД на каждый запрос
+        'CONN_MAX_AGE': env_int('DJANGO_CONN_MAX_AGE', 60 if PRODUCTION else 0),
+    }
+}
+
+# PRAGMA для каждого нового соединения с SQLite (core.signals). WAL
+# позволяет читать во время записи, busy_timeout (мс) - ждать снятия
+# блокировки вместо ошибки «database is locked», cache_size в КиБ
+# (отрицательное значение), mmap_size в байтах
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': env_int('DJANGO_SQLITE_BUSY_TIMEOUT', 5000),
+    'cache_size': -env_int('DJANGO_SQLITE_CACHE_KB', 64000),
+    'mmap_size': env_int('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+} if env_bool('DJANGO_SQLITE_TUNING', PRODUCTION) else {}
+
+# Реплики только для чтения (core.db_router): пути к файлам SQLite через
+# запятую. Локально реплику заменяет копия основной БД (sync_replica)
+DATABASES.update(replica_databases(
+    DATABASES['default'], env_list('DJANGO_DB_REPLICAS', [])
+))
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Страницы, которые читают из реплик
+REPLICA_READ_VIEWS = [
+    'posts:homepage',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post_detail',
+    'about:author',
+    'about:tech',
+]
+# Сколько секунд после изменения пользователь читает из основной БД
+REPLICA_STICKY_SECONDS = env_int('DJANGO_REPLICA_STICKY_SECONDS', 10)
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -141,3 +249,62 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.environ.get(
+    'DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles')
+)
+# collectstatic добавляет к именам файлов хеш содержимого и кладёт рядом
+# сжатые копии .gz и .br (core.storage). Шаблоны ссылаются на имена с
+# хешем, поэтому перед запуском нужен collectstatic
+if env_bool('DJANGO_STATIC_MANIFEST', PRODUCTION):
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Раздача STATIC_ROOT из WSGI-приложения (core.static) и время кэширования
+# в браузере файлов без хеша в имени, в секундах
+STATIC_SERVE = env_bool('DJANGO_SERVE_STATIC', PRODUCTION)
+STATIC_MAX_AGE = env_int('DJANGO_STATIC_MAX_AGE', 60)
+
+# Курсорная пагинация лент постов вместо номеров страниц
+POSTS_CURSOR_PAGINATION = False
+
+# Кэш готовых страниц лент (posts.cache) и время жизни записи в секундах
+POSTS_PAGE_CACHE = False
+POSTS_PAGE_CACHE_TIMEOUT = 300
+POSTS_PAGE_CACHE_ALIAS = 'default'
+# Одна копия страницы для всех пользователей: шапка и кнопка правки
+# вставляются в неё при ответе (core.holes)
+POSTS_PAGE_CACHE_HOLES = False
+
+# Кэш списка групп (posts.groups): общий для процессов бэкенд кэша и
+# время жизни списка в секундах
+POSTS_GROUP_CACHE_ALIAS = 'default'
+POSTS_GROUP_CACHE_TIMEOUT = 3600
+
+# Материализованное начало главной ленты (posts.home_feed): число постов
+# и бэкенд кэша для общего числа постов; после включения таблицу нужно
+# заполнить командой rebuild_home_feed
+POSTS_HOME_FEED = False
+POSTS_HOME_FEED_SIZE = 100
+POSTS_HOME_FEED_CACHE_ALIAS = 'default'
+
+# Профилирование запросов (core.middleware.ProfilingMiddleware): заголовок
+# Server-Timing и JSON-отчёт для персонала по ?_profile=json
+PROFILING = False
+PROFILING_REPORT = True
+
+# Уменьшение ответов (core.middleware.CompressionMiddleware): схлопывание
+# пробелов в HTML и сжатие gzip/brotli по Accept-Encoding. Ответы меньше
+# RESPONSE_COMPRESSION_MIN_SIZE байт не сжимаются: выигрыш меньше
+# накладных расходов
+RESPONSE_MINIFY_HTML = env_bool('DJANGO_MINIFY_HTML', PRODUCTION)
+RESPONSE_COMPRESSION = env_bool('DJANGO_COMPRESS_RESPONSES', PRODUCTION)
+RESPONSE_COMPRESSION_MIN_SIZE = env_int('DJANGO_COMPRESSION_MIN_SIZE', 512)
+
+# ASGI (yatube/asgi.py, core.asgi): размер пула потоков для ORM и рендера,
+# т.е. предел одновременных соединений с БД на процесс, и страницы,
+# которые обслуживают асинхронные view
+ASYNC_DB_POOL_SIZE = env_int('DJANGO_ASYNC_DB_POOL_SIZE', 8)
+ASYNC_VIEWS = {
+    'posts:homepage': 'posts.async_views.index',
+    'posts:group_posts': 'posts.async_views.group_posts',
+    'posts:profile': 'posts.async_views.profile',
+    'posts:post_detail': 'posts.async_views.post_detail',
+}
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Статика из STATIC_ROOT раздаётся до Django (STATIC_SERVE)
+if settings.STATIC_SERVE:
+    from core.static import StaticFilesApp
+
+    application = StaticFilesApp(application)
+
+# Шаблоны компилируются до первого запроса (TEMPLATES_WARM_ON_STARTUP)
+from core.warmup import warm_on_startup  # noqa: E402
+
+warm_on_startup()